@@ -1,5 +1,4 @@
 import pandas as pd
-import pyproj
 
 class BikeCrashDataset():
     """
@@ -77,6 +76,7 @@ class BikeCrashDataset():
         )
 
         # Transform coordinates from EPSG:4326 to EPSG:3857 (Web Mercator).
+        import pyproj
         transformer = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
         x_coords, y_coords = transformer.transform(
             self.df['LONGITUDE'].values,
@@ -87,13 +87,15 @@ class BikeCrashDataset():
 
         self.df = self.df[['CRASH DATE', 'CRASH TIME', 'LATITUDE', 'LONGITUDE', 'CRASH_DATETIME', 'x', 'y']]
 
-    def citibike_alignment(self, citibike_dataset) :
+    def citibike_alignment(self, citibike_dataset, service_area=None) :
         """
         Calculates centered the 'x' and 'y' coordinates of the bike crash dataset given
         Citibike dataset and constrains Data to relevant area.
 
         Parameters:
             citibike_dataset: The Citibike dataset which stores its center values
+            service_area (ServiceArea): Optional service area polygon, crashes outside of it are
+                removed in addition to those outside of the bounding box of the stations
         """
 
         self.df['x_centered'] = self.df['x'] - citibike_dataset.x_center
@@ -110,6 +112,9 @@ class BikeCrashDataset():
                           (self.df['y_centered'] <= max_y)
                         ]
 
+        if service_area is not None:
+            self.df = self.df[service_area.contains(self.df['x_centered'].values, self.df['y_centered'].values)]
+
     def get_spatio_temporal_rasterization(self, bins=100, time_bin_size=15):
         """
         Aggregates the crash data into a spatio-temporal grid (raster) and returns a new DataFrame that can be used to fit crash models. Data needs to be aligned with Citibike dataset.
@@ -1,7 +1,6 @@
 import os
 import zipfile
 import pandas as pd
-import pyproj
 import math
 import numpy as np
 
@@ -12,20 +11,26 @@ class CitibikeDataset():
     Supports loading data from a single CSV file, a directory containing
     multiple CSV files, or ZIP files containing CSVs.
     """
+
+    REQUIRED_COLUMNS = [
+        'ride_id', 'rideable_type', 'started_at', 'ended_at',
+        'start_station_name', 'start_station_id', 'end_station_name', 'end_station_id',
+        'start_lat', 'start_lng', 'end_lat', 'end_lng', 'member_casual'
+    ]
+
     def __init__(self, path):
         """
         Initializes the CitibikeDataset by loading data from a file, directory, or ZIP archive.
 
         Arguments:
-            path (str): Path to a CSV file, a directory containing CSV files, or a ZIP file.
+            path (str or DataFrame): Path to a CSV file, a directory containing CSV files, or a ZIP file,
+                or a DataFrame of raw rides that were already loaded (e.g. from a RideStore).
         """
-        self.df_rides = None
-        self.dropped_rows = None
-        self.stations = None
-        self.duration_mean = None
-        self.duration_std = None
-        self.x_center = None
-        self.y_center = None
+        self._init_state()
+
+        if isinstance(path, pd.DataFrame):
+            self._process_rides(path)
+            return
 
         if not os.path.exists(path):
             raise FileNotFoundError(f"The provided path '{path}' does not exist.")
@@ -71,12 +76,87 @@ class CitibikeDataset():
             except Exception as e:
                 raise ValueError(f"Error concatenating DataFrames: {e}")
 
-        required_columns = [
-            'ride_id', 'rideable_type', 'started_at', 'ended_at',
-            'start_station_name', 'start_station_id', 'end_station_name', 'end_station_id',
-            'start_lat', 'start_lng', 'end_lat', 'end_lng', 'member_casual'
-        ]
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        self._process_rides(df)
+
+    @classmethod
+    def from_store(cls, path, start=None, end=None, bbox=None):
+        """
+        Creates a CitibikeDataset from the rides of a RideStore that match the given predicates.
+        Only the partitions and row groups that can contain matching rides are read.
+
+        Arguments:
+            path (str): Root directory of the ride store
+            start: Only rides starting at or after this time are loaded
+            end: Only rides starting before this time are loaded
+            bbox (tuple): Only rides starting inside (min_lng, min_lat, max_lng, max_lat) are loaded
+
+        Returns:
+            CitibikeDataset: The dataset
+        """
+        from datasets.ride_store import RideStore
+
+        df = RideStore(path).load(start=start, end=end, bbox=bbox)
+        if df.empty:
+            raise ValueError("No rides in the store match the given predicates.")
+
+        return cls(df)
+
+    @classmethod
+    def from_stations(cls, stations, x_center, y_center):
+        """
+        Creates a dataset that only holds stations and the coordinate center, e.g. for pricing from
+        precomputed traffic tables where the rides are not needed.
+
+        Arguments:
+            stations (DataFrame): Stations with the columns 'station_id', 'x_centered' and 'y_centered'
+                (and optionally 'lat' and 'lng')
+            x_center (float): x center of the Web Mercator coordinates
+            y_center (float): y center of the Web Mercator coordinates
+
+        Returns:
+            CitibikeDataset: The dataset, its df_rides is None
+        """
+        dataset = cls.__new__(cls)
+        dataset._init_state()
+        dataset.stations = stations
+        dataset.x_center = x_center
+        dataset.y_center = y_center
+
+        return dataset
+
+    def _init_state(self):
+        """
+        Sets all attributes of an empty dataset.
+        """
+        self.df_rides = None
+        self.dropped_rows = None
+        self.stations = None
+        self.duration_mean = None
+        self.duration_std = None
+        self.x_center = None
+        self.y_center = None
+
+    def to_store(self, path, tile_size=None, row_group_size=100000):
+        """
+        Writes the rides to a RideStore partitioned by start date (and optionally a spatial tile).
+
+        Arguments:
+            path (str): Root directory of the ride store
+            tile_size (float): Size of the spatial tiles in degrees, None disables spatial partitioning
+            row_group_size (int): Maximum number of rows per Parquet row group
+        """
+        from datasets.ride_store import RideStore
+
+        RideStore(path).write(self.df_rides[self.REQUIRED_COLUMNS], tile_size=tile_size, row_group_size=row_group_size)
+
+    def _process_rides(self, df):
+        """
+        Cleans the raw rides, computes ride durations and station information.
+
+        Arguments:
+            df (DataFrame): Raw Citibike rides
+        """
+        missing_columns = [col for col in self.REQUIRED_COLUMNS if col not in df.columns]
         if missing_columns:
             raise ValueError("Does the CSV file contain the Citibike dataset?" 
                 f"The following required columns are missing from the dataset: {missing_columns}")
@@ -169,6 +249,7 @@ class CitibikeDataset():
         stations['end_count'] = stations['end_count'].fillna(0).astype(int)
 
         # Transform geographic coordinates to Web Mercator (EPSG:3857).
+        import pyproj
         transformer = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
         stations['x'], stations['y'] = transformer.transform(stations['lng'].values, stations['lat'].values)
 
@@ -0,0 +1,197 @@
+import os
+import json
+import uuid
+import numpy as np
+import pandas as pd
+
+
+class RideStore():
+    """
+    On-disk store for Citibike rides in Parquet files, partitioned by start date and optionally by
+    a coarse spatial tile of the start position. A manifest keeps min/max statistics per file, so
+    that queries only open the files and read the row groups that can contain matching rides.
+
+    Layout:
+        <root>/_manifest.json
+        <root>/date=YYYY-MM-DD[/tile=<i>_<j>]/part-<uuid>.parquet
+    """
+
+    MANIFEST = '_manifest.json'
+    STAT_COLUMNS = ['started_at', 'start_lat', 'start_lng']
+
+    def __init__(self, root):
+        """
+        Arguments:
+            root (str): Root directory of the store, created on the first write
+        """
+        self.root = root
+
+    def _read_manifest(self):
+        """
+        Reads the manifest of the store.
+
+        Returns:
+            list: One dict per Parquet file with its path, row count and column statistics
+        """
+        manifest_path = os.path.join(self.root, self.MANIFEST)
+        if not os.path.exists(manifest_path):
+            return []
+
+        with open(manifest_path, 'r') as f:
+            return json.load(f)['files']
+
+    def _write_manifest(self, files):
+        """
+        Atomically replaces the manifest of the store.
+
+        Arguments:
+            files (list): File entries as returned by _read_manifest()
+        """
+        manifest_path = os.path.join(self.root, self.MANIFEST)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': 1, 'files': files}, f, indent=1)
+        os.replace(tmp_path, manifest_path)
+
+    def write(self, df_rides, tile_size=None, row_group_size=100000):
+        """
+        Appends rides to the store. Each partition gets a new file, rides within a file are sorted
+        by start time so that row group statistics are selective for time queries.
+
+        Arguments:
+            df_rides (DataFrame): Rides with at least the columns 'started_at', 'start_lat' and 'start_lng'
+            tile_size (float): Size of the spatial tiles in degrees, None disables spatial partitioning
+            row_group_size (int): Maximum number of rows per Parquet row group
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        df = df_rides.copy()
+        df['started_at'] = pd.to_datetime(df['started_at'])
+        df = df.sort_values('started_at', kind='stable')
+
+        keys = [df['started_at'].dt.strftime('date=%Y-%m-%d')]
+        if tile_size is not None:
+            tile_x = np.floor(df['start_lng'].values / tile_size).astype(int)
+            tile_y = np.floor(df['start_lat'].values / tile_size).astype(int)
+            keys.append(pd.Series([f'tile={i}_{j}' for i, j in zip(tile_x, tile_y)], index=df.index))
+
+        files = self._read_manifest()
+        for key, partition in df.groupby(keys, sort=True):
+            key = (key,) if isinstance(key, str) else key
+            relative_dir = os.path.join(*key)
+            os.makedirs(os.path.join(self.root, relative_dir), exist_ok=True)
+
+            relative_path = os.path.join(relative_dir, f'part-{uuid.uuid4().hex}.parquet')
+            table = pa.Table.from_pandas(partition, preserve_index=False)
+            pq.write_table(table, os.path.join(self.root, relative_path), row_group_size=row_group_size)
+
+            files.append({
+                'path': relative_path,
+                'n_rows': len(partition),
+                'min': {col: self._to_json(partition[col].min()) for col in self.STAT_COLUMNS},
+                'max': {col: self._to_json(partition[col].max()) for col in self.STAT_COLUMNS},
+            })
+
+        self._write_manifest(files)
+
+    @staticmethod
+    def _to_json(value):
+        """
+        Converts a statistic to a JSON serializable value.
+        """
+        if isinstance(value, pd.Timestamp):
+            return value.isoformat()
+        return float(value)
+
+    @staticmethod
+    def _overlaps(stats_min, stats_max, start, end, bbox):
+        """
+        Checks if a file or row group with the given statistics can contain matching rides.
+
+        Arguments:
+            stats_min (dict): Minimum values of 'started_at', 'start_lat' and 'start_lng'
+            stats_max (dict): Maximum values of 'started_at', 'start_lat' and 'start_lng'
+            start, end (Timestamp): Time range [start, end), None means unbounded
+            bbox (tuple): (min_lng, min_lat, max_lng, max_lat) or None
+
+        Returns:
+            bool: False if no row can match
+        """
+        if start is not None and pd.Timestamp(stats_max['started_at']) < start:
+            return False
+        if end is not None and pd.Timestamp(stats_min['started_at']) >= end:
+            return False
+        if bbox is not None:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            if stats_max['start_lng'] < min_lng or stats_min['start_lng'] > max_lng:
+                return False
+            if stats_max['start_lat'] < min_lat or stats_min['start_lat'] > max_lat:
+                return False
+        return True
+
+    def load(self, start=None, end=None, bbox=None, columns=None):
+        """
+        Loads the rides that start in the time range and bounding box. Files are pruned with the
+        manifest statistics, row groups with the Parquet statistics, remaining rows are filtered exactly.
+
+        Arguments:
+            start: Only rides starting at or after this time are loaded
+            end: Only rides starting before this time are loaded
+            bbox (tuple): Only rides starting inside (min_lng, min_lat, max_lng, max_lat) are loaded
+            columns (list): Columns to load (default is all columns)
+
+        Returns:
+            DataFrame: The matching rides
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys(list(columns) + self.STAT_COLUMNS))
+
+        tables = []
+        for entry in self._read_manifest():
+            if not self._overlaps(entry['min'], entry['max'], start, end, bbox):
+                continue
+
+            parquet_file = pq.ParquetFile(os.path.join(self.root, entry['path']))
+            metadata = parquet_file.metadata
+            stat_indices = {col: parquet_file.schema_arrow.get_field_index(col) for col in self.STAT_COLUMNS}
+
+            row_groups = []
+            for i in range(metadata.num_row_groups):
+                row_group = metadata.row_group(i)
+                stats = {col: row_group.column(j).statistics for col, j in stat_indices.items()}
+                if any(s is None or not s.has_min_max for s in stats.values()):
+                    row_groups.append(i)
+                elif self._overlaps({c: s.min for c, s in stats.items()},
+                                    {c: s.max for c, s in stats.items()}, start, end, bbox):
+                    row_groups.append(i)
+
+            if row_groups:
+                tables.append(parquet_file.read_row_groups(row_groups, columns=read_columns))
+
+        if not tables:
+            return pd.DataFrame(columns=columns)
+
+        df = pa.concat_tables(tables).to_pandas()
+
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= (df['started_at'] >= start).values
+        if end is not None:
+            mask &= (df['started_at'] < end).values
+        if bbox is not None:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            mask &= df['start_lng'].between(min_lng, max_lng).values
+            mask &= df['start_lat'].between(min_lat, max_lat).values
+
+        df = df[mask].reset_index(drop=True)
+        if columns is not None:
+            df = df[list(columns)]
+
+        return df
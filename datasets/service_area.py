@@ -0,0 +1,137 @@
+import json
+import numpy as np
+
+
+class ServiceArea():
+    """
+    Polygon of the Citibike service area in centered Web Mercator coordinates. It replaces the
+    axis-aligned bounding box of the stations, which in NYC contains large areas of water and land
+    without service. Point-in-polygon tests use a prepared geometry and are vectorized, masks of
+    grids are cached so that rasters and KDE grids of the same shape reuse them.
+    """
+
+    def __init__(self, polygon):
+        """
+        Arguments:
+            polygon: Shapely (Multi)Polygon in centered coordinates
+        """
+        import shapely
+
+        self.polygon = polygon
+        shapely.prepare(self.polygon)
+        self._masks = {}
+
+    @classmethod
+    def from_stations(cls, stations, buffer=500, hull='convex', concave_ratio=0.1):
+        """
+        Builds the service area as hull of the stations plus a buffer.
+
+        Arguments:
+            stations (DataFrame): Stations with the columns 'x_centered' and 'y_centered'
+            buffer (float): Buffer around the hull in meters
+            hull (str): 'convex' or 'concave'
+            concave_ratio (float): Ratio of the concave hull between 0 (most concave) and 1 (convex)
+
+        Returns:
+            ServiceArea: The service area
+        """
+        import shapely
+
+        points = shapely.multipoints(stations[['x_centered', 'y_centered']].values)
+        if hull == 'convex':
+            polygon = shapely.convex_hull(points)
+        elif hull == 'concave':
+            polygon = shapely.concave_hull(points, ratio=concave_ratio)
+        else:
+            raise ValueError(f"Unknown hull '{hull}'. Use 'convex' or 'concave'.")
+
+        return cls(shapely.buffer(polygon, buffer))
+
+    @classmethod
+    def from_geojson(cls, path, x_center, y_center):
+        """
+        Reads the service area from a GeoJSON file with (Multi)Polygons in EPSG:4326. All polygons
+        of a FeatureCollection are merged.
+
+        Arguments:
+            path (str): Path to the GeoJSON file
+            x_center (float): x center of the Citibike dataset
+            y_center (float): y center of the Citibike dataset
+
+        Returns:
+            ServiceArea: The service area
+        """
+        import shapely
+        import pyproj
+
+        with open(path, 'r') as f:
+            geojson = json.load(f)
+
+        if geojson.get('type') == 'FeatureCollection':
+            geometries = [shapely.geometry.shape(feature['geometry']) for feature in geojson['features']]
+        elif geojson.get('type') == 'Feature':
+            geometries = [shapely.geometry.shape(geojson['geometry'])]
+        else:
+            geometries = [shapely.geometry.shape(geojson)]
+
+        transformer = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+
+        def project(coords):
+            x, y = transformer.transform(coords[:, 0], coords[:, 1])
+            return np.column_stack([x - x_center, y - y_center])
+
+        polygon = shapely.union_all([shapely.transform(g, project) for g in geometries])
+
+        return cls(polygon)
+
+    def contains(self, x, y):
+        """
+        Tests which points lie inside the service area (points on the boundary count as inside).
+
+        Arguments:
+            x, y (array-like): Centered coordinates of the points, arrays of any shape
+
+        Returns:
+            ndarray: Boolean mask of the shape of x and y
+        """
+        import shapely
+
+        return shapely.intersects_xy(self.polygon, np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+
+    def cell_mask(self, xedges, yedges):
+        """
+        Returns which cells of a raster have their center inside the service area. The mask has the
+        layout of np.histogram2d, i.e. shape (len(xedges) - 1, len(yedges) - 1), and is cached.
+
+        Arguments:
+            xedges, yedges (ndarray): Bin edges of the raster
+
+        Returns:
+            ndarray: Boolean mask of the cells
+        """
+        key = (len(xedges), len(yedges), xedges[0], xedges[-1], yedges[0], yedges[-1])
+        if key not in self._masks:
+            x_centers = (xedges[:-1] + xedges[1:]) / 2
+            y_centers = (yedges[:-1] + yedges[1:]) / 2
+            xx, yy = np.meshgrid(x_centers, y_centers, indexing='ij')
+            self._masks[key] = self.contains(xx, yy)
+
+        return self._masks[key]
+
+    def grid_mask(self, x_grid, y_grid):
+        """
+        Returns which points of a meshgrid lie inside the service area. The mask has the layout
+        of np.meshgrid(x_grid, y_grid), i.e. shape (len(y_grid), len(x_grid)), and is cached.
+
+        Arguments:
+            x_grid, y_grid (ndarray): Grid coordinates along each axis
+
+        Returns:
+            ndarray: Boolean mask of the grid points
+        """
+        key = ('grid', len(x_grid), len(y_grid), x_grid[0], x_grid[-1], y_grid[0], y_grid[-1])
+        if key not in self._masks:
+            xx, yy = np.meshgrid(x_grid, y_grid)
+            self._masks[key] = self.contains(xx, yy)
+
+        return self._masks[key]
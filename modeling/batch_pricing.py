@@ -0,0 +1,230 @@
+"""
+Offline batch pricing of whole Citibike trip exports, e.g. for actuarial back-testing:
+
+    python -m modeling.batch_pricing --trips data/202312-citibike-tripdata.zip \
+        --citibike data/2023-citibike-tripdata --output prices.parquet --workers 4
+
+Trips are read in chunks, priced vectorized with PriceCalculator.predict_insurance_prices() and
+streamed to the output file, so memory stays bounded by the chunk size.
+"""
+import os
+import sys
+import time
+import zipfile
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+
+TRIP_COLUMNS = ['ride_id', 'started_at', 'start_station_id']
+
+
+def iter_trip_chunks(path, chunksize=500000):
+    """
+    Reads trips from a CSV file, a ZIP archive of CSV files or a directory containing both, chunk
+    by chunk and without extracting the archives.
+
+    Arguments:
+        path (str): Path to a CSV file, ZIP file or directory
+        chunksize (int): Number of trips per chunk
+
+    Yields:
+        DataFrame: Chunks with the columns 'ride_id', 'started_at' and 'start_station_id'
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file in sorted(files):
+                if file.lower().endswith(('.csv', '.zip')):
+                    yield from iter_trip_chunks(os.path.join(root, file), chunksize)
+        return
+
+    read_kwargs = dict(usecols=TRIP_COLUMNS, dtype={'ride_id': str, 'start_station_id': str}, chunksize=chunksize)
+
+    if path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path, 'r') as z:
+            for name in sorted(z.namelist()):
+                # Skip e.g. __MACOSX/ metadata that ships with the Citibike archives
+                if name.lower().endswith('.csv') and not os.path.basename(name).startswith('.'):
+                    with z.open(name) as f:
+                        yield from pd.read_csv(f, **read_kwargs)
+    elif path.lower().endswith('.csv'):
+        yield from pd.read_csv(path, **read_kwargs)
+    else:
+        raise ValueError(f"Unsupported file format '{path}'. Please provide CSV or ZIP files.")
+
+
+def price_chunk(calculator, chunk):
+    """
+    Prices all trips of a chunk.
+
+    Arguments:
+        calculator (PriceCalculator): Calculator used for pricing
+        chunk (DataFrame): Trips with the columns 'ride_id', 'started_at' and 'start_station_id'
+
+    Returns:
+        DataFrame: The columns 'ride_id', 'insurance_price' and 'risk_per_ride'
+    """
+    prices, risks = calculator.predict_insurance_prices(chunk['started_at'].values, chunk['start_station_id'].values)
+
+    return pd.DataFrame({'ride_id': chunk['ride_id'].values, 'insurance_price': prices, 'risk_per_ride': risks})
+
+
+class _ResultWriter():
+    """
+    Appends priced chunks to a CSV or Parquet file.
+    """
+
+    def __init__(self, path):
+        """
+        Arguments:
+            path (str): Output file, written as Parquet if it ends with '.parquet', otherwise as CSV
+        """
+        self.path = path
+        self.parquet = path.lower().endswith('.parquet')
+        self._writer = None
+        self._header = True
+
+    def write(self, df):
+        """
+        Appends a chunk of results.
+        """
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        """
+        Finalizes the output file.
+        """
+        if self._writer is not None:
+            self._writer.close()
+
+
+_worker_calculator = None
+
+
+def _lightweight_calculator(calculator):
+    """
+    Copies a calculator without the rides of its dataset, which are not needed once the traffic
+    table is computed, so that it can be sent to worker processes cheaply.
+    """
+    from datasets.citibike_dataset import CitibikeDataset
+    from modeling.price_calculator import PriceCalculator
+
+    if calculator.traffic_counter is not None:
+        raise ValueError("Live traffic counters can not be shared with worker processes, use workers=1.")
+
+    calculator.warm_up()
+    dataset = calculator.citibike_dataset
+
+    return PriceCalculator(
+        calculator.model, CitibikeDataset.from_stations(dataset.stations, dataset.x_center, dataset.y_center),
+        time_bin_size=calculator.time_bin_size, cost_per_accident=calculator.cost_per_accident,
+        traffic_adjustment=calculator.traffic_adjustment, traffic_table=calculator.traffic_table
+    )
+
+
+def _init_worker(calculator):
+    """
+    Stores the calculator in the worker process.
+    """
+    global _worker_calculator
+    _worker_calculator = calculator
+
+
+def _price_chunk_in_worker(chunk):
+    """
+    Prices a chunk with the calculator of the worker process.
+    """
+    return price_chunk(_worker_calculator, chunk)
+
+
+def price_trips(calculator, trips_path, output_path, chunksize=500000, workers=1, log=sys.stderr):
+    """
+    Prices all trips of a trip export and streams the results to output_path.
+
+    Arguments:
+        calculator (PriceCalculator): Calculator used for pricing
+        trips_path (str): Path to a CSV file, ZIP file or directory with trips
+        output_path (str): Output file, written as Parquet if it ends with '.parquet', otherwise as CSV
+        chunksize (int): Number of trips per chunk
+        workers (int): Number of worker processes, 1 prices in the current process
+        log: Stream progress is reported to, None disables reporting
+
+    Returns:
+        dict: Number of priced rows, elapsed seconds and rows per second
+    """
+    writer = _ResultWriter(output_path)
+    start = time.perf_counter()
+    n_rows = 0
+
+    def report(df):
+        nonlocal n_rows
+        writer.write(df)
+        n_rows += len(df)
+        if log is not None:
+            elapsed = time.perf_counter() - start
+            print(f"{n_rows} rows priced, {n_rows / elapsed:.0f} rows/s", file=log)
+
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(_lightweight_calculator(calculator),)) as pool:
+                # At most two chunks per worker are in flight to keep memory bounded
+                pending = deque()
+                for chunk in iter_trip_chunks(trips_path, chunksize):
+                    pending.append(pool.submit(_price_chunk_in_worker, chunk))
+                    if len(pending) >= 2 * workers:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+        else:
+            for chunk in iter_trip_chunks(trips_path, chunksize):
+                report(price_chunk(calculator, chunk))
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {'rows': n_rows, 'seconds': elapsed, 'rows_per_second': n_rows / elapsed if elapsed > 0 else 0.0}
+
+
+def main(argv=None):
+    """
+    Command-line entry point, see 'python -m modeling.batch_pricing --help'.
+    """
+    parser = argparse.ArgumentParser(description='Price every ride of a Citibike trip export.')
+    parser.add_argument('--trips', required=True, help='Trip CSV, ZIP or directory to price')
+    parser.add_argument('--citibike', required=True, help='Citibike data used for stations and traffic')
+    parser.add_argument('--model', default='fitted_models/crash_model.pkl', help='Path to the crash model')
+    parser.add_argument('--output', required=True, help='Output file (.csv or .parquet)')
+    parser.add_argument('--chunksize', type=int, default=500000, help='Number of trips per chunk')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+    parser.add_argument('--time-bin-size', type=int, default=30, help='Time bin size in minutes')
+    parser.add_argument('--cost-per-accident', type=float, default=5000, help='Estimated cost per crash')
+    parser.add_argument('--traffic-adjustment', type=float, default=0.001, help='Traffic adjustment factor')
+    args = parser.parse_args(argv)
+
+    from datasets.citibike_dataset import CitibikeDataset
+    from modeling.price_calculator import PriceCalculator
+
+    calculator = PriceCalculator(
+        args.model, CitibikeDataset(args.citibike), time_bin_size=args.time_bin_size,
+        cost_per_accident=args.cost_per_accident, traffic_adjustment=args.traffic_adjustment
+    )
+    summary = price_trips(calculator, args.trips, args.output, chunksize=args.chunksize, workers=args.workers)
+    print(f"Priced {summary['rows']} rides in {summary['seconds']:.1f}s ({summary['rows_per_second']:.0f} rows/s).")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,331 @@
 from __future__ import annotations
 
+import time
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.colors import LogNorm, Normalize
-from sklearn.neighbors import KernelDensity
+
+
+BANDWIDTH_RULES = ('scott', 'silverman')
+
+
+def _rule_of_thumb_bandwidth(data, rule):
+    """
+    Scott's or Silverman's rule for a single bandwidth of 2D data. Sklearn's own rules assume
+    standardized data, here the factor is scaled by a robust spread of the coordinates, i.e. the
+    mean over both axes of min(std, IQR / 1.349).
+    """
+    n, d = data.shape
+    std = data.std(axis=0, ddof=1)
+    iqr = np.subtract(*np.percentile(data, [75, 25], axis=0)) / 1.349
+    sigma = np.where(iqr > 0, np.minimum(std, iqr), std).mean()
+
+    if rule == 'scott':
+        factor = n ** (-1 / (d + 4))
+    elif rule == 'silverman':
+        factor = (n * (d + 2) / 4) ** (-1 / (d + 4))
+    else:
+        raise ValueError(f"Unknown bandwidth rule '{rule}'. Use one of {BANDWIDTH_RULES}.")
+
+    return float(sigma * factor)
+
+
+def _held_out_log_likelihood(train, test, bandwidth, kernel):
+    """
+    Mean log-likelihood of the test points under a KDE fitted on the training points. A small
+    relative tolerance makes scoring several times faster without changing which bandwidth wins.
+    """
+    from sklearn.neighbors import KernelDensity
+
+    kde = KernelDensity(bandwidth=bandwidth, kernel=kernel, rtol=1e-4).fit(train)
+    return float(np.mean(kde.score_samples(test)))
+
+
+def select_bandwidth(data, method='cv', kernel='gaussian', candidates=None, n_candidates=15,
+                     sample_size=5000, cv=3, n_jobs=-1, random_state=0):
+    """
+    Selects a KDE bandwidth from the data.
+
+    Likelihood cross-validation on all points costs O(n^2) per candidate, so with method='cv' it
+    runs on a random subsample, all (candidate, fold) pairs are evaluated in one parallel pool. The
+    best bandwidth of the subsample is scaled to the full sample size with the asymptotic rate
+    n^(-1/6) of a 2D KDE.
+
+    Arguments:
+        data (ndarray): Array of shape (n_samples, 2)
+        method (str): 'scott', 'silverman' or 'cv'
+        kernel (str): Sklearn KDE kernel used for cross-validation
+        candidates (array-like): Bandwidths tried by cross-validation, by default n_candidates
+            values spaced logarithmically between 1/20 and 2 times Silverman's bandwidth
+        n_candidates (int): Number of default candidates
+        sample_size (int): Maximum number of points used for cross-validation
+        cv (int): Number of cross-validation folds
+        n_jobs (int): Number of parallel jobs, -1 uses all cores
+        random_state (int): Seed of the subsample and the folds
+
+    Returns:
+        tuple: (bandwidth, info) where info is a dict with the method, the chosen bandwidth, the
+        seconds spent and, for 'cv', the candidates and their mean held-out log-likelihoods
+    """
+    start = time.perf_counter()
+    data = np.asarray(data, dtype=float)
+
+    if method in BANDWIDTH_RULES:
+        bandwidth = _rule_of_thumb_bandwidth(data, method)
+        return bandwidth, {'method': method, 'bandwidth': bandwidth, 'seconds': time.perf_counter() - start}
+    if method != 'cv':
+        raise ValueError(f"Unknown bandwidth selection method '{method}'. Use 'scott', 'silverman' or 'cv'.")
+
+    from joblib import Parallel, delayed
+
+    rng = np.random.default_rng(random_state)
+    sample = data[rng.permutation(len(data))[:sample_size]]
+    folds = np.array_split(np.arange(len(sample)), cv)
+
+    if candidates is None:
+        reference = _rule_of_thumb_bandwidth(sample, 'silverman')
+        candidates = reference * np.logspace(np.log10(1 / 20), np.log10(2), n_candidates)
+    candidates = np.asarray(candidates, dtype=float)
+
+    tasks = [(c, f) for c in range(len(candidates)) for f in range(cv)]
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_held_out_log_likelihood)(
+            sample[np.concatenate(folds[:f] + folds[f + 1:])], sample[folds[f]], candidates[c], kernel)
+        for c, f in tasks
+    )
+    scores = np.asarray(scores).reshape(len(candidates), cv).mean(axis=1)
+
+    n_train = len(sample) - len(sample) // cv
+    bandwidth = float(candidates[np.argmax(scores)] * (len(data) / n_train) ** (-1 / 6))
+
+    return bandwidth, {
+        'method': 'cv',
+        'bandwidth': bandwidth,
+        'seconds': time.perf_counter() - start,
+        'candidates': candidates.tolist(),
+        'scores': scores.tolist(),
+        'sample_size': len(sample),
+    }
+
+
+def _bin_indices(values, edges):
+    """
+    Computes the bin of each value for evenly spaced edges by arithmetic instead of a binary search,
+    with the same result as np.histogram2d: the last bin includes its right edge and values outside
+    of the edges get -1.
+    """
+    n_bins = len(edges) - 1
+    index = np.floor((values - edges[0]) * (n_bins / (edges[-1] - edges[0])))
+    index = np.clip(np.nan_to_num(index), 0, n_bins - 1).astype(np.intp)
+
+    # Correct rounding errors by one bin at the edges
+    index -= (index > 0) & (values < edges[index])
+    index += (index < n_bins - 1) & (values >= edges[np.minimum(index + 1, n_bins)])
+
+    index[~((values >= edges[0]) & (values <= edges[-1]))] = -1
+
+    return index
 
 
 class DensityEstimator():
     """
     Performs Kernel Density Estimation (KDE) and raster-based density estimation. Can be used to 
     plot the density and heatmaps.
+
+    Besides the in-memory mode, where all samples are passed at once, the estimator has an
+    accumulator mode for data larger than memory: with a fixed range and number of bins, chunks of
+    coordinates are added into one counts array (see from_chunks() and update()). The KDE is only
+    fitted when it is first used, in accumulator mode on the counts weighted by the bin centers.
+
+    The plotting methods are thin wrappers around modeling.density_plotting, which is only imported
+    when something is drawn, so that the numeric core can be used without loading matplotlib.
     """
-    def __init__(self, data, bandwidth=1, kernel='gaussian'):
+    def __init__(self, data=None, bandwidth=1, kernel='gaussian', bandwidth_options=None, x_range=None,
+                 y_range=None, bins=None):
         """
         Arguments:
-            data (ndarray): Array of shape (n_samples, 2) (e.g., [[x, y], ...])
-            bandwidth (float):  Bandwidth of KDE
+            data (ndarray): Array of shape (n_samples, 2) (e.g., [[x, y], ...]), may be None in
+                accumulator mode
+            bandwidth (float or str):  Bandwidth of KDE, or 'scott', 'silverman' or 'cv' to select it
+                from the data (see select_bandwidth())
             kernel (str): Sklearn KDE kernel to use 
+            bandwidth_options (dict): Keyword arguments passed on to select_bandwidth()
+            x_range, y_range (tuple): Fixed (min, max) ranges, by default the range of the data
+            bins (int): Number of bins per axis of the accumulated histogram, enables the accumulator
+                mode, where data is added to the counts and not kept
         """
-        self.data = data
-        self.bandwidth = bandwidth
+        if isinstance(bandwidth, str) and bandwidth not in BANDWIDTH_RULES + ('cv',):
+            raise ValueError(f"Unknown bandwidth selection method '{bandwidth}'. Use 'scott', 'silverman' or 'cv'.")
+        if data is None and (x_range is None or y_range is None or bins is None):
+            raise ValueError("Without data, x_range, y_range and bins are required.")
+
         self.kernel = kernel
-        self.kde_model = KernelDensity(bandwidth=self.bandwidth, kernel=self.kernel)
-        self.kde_model.fit(data)
+        self.bandwidth_options = bandwidth_options or {}
+        # Method name if the bandwidth is selected from the data, None for a fixed bandwidth
+        self.bandwidth_method = bandwidth if isinstance(bandwidth, str) else None
+        self._bandwidth = bandwidth
+        self._bandwidth_selection = None
+        self._kde_model = None
 
-        self.x_min = self.data[:, 0].min()
-        self.x_max = self.data[:, 0].max()
-        self.y_min = self.data[:, 1].min()
-        self.y_max = self.data[:, 1].max()
-    
-    def evaluate_grid(self, grid_size=1000):
+        self.x_min, self.x_max = x_range if x_range is not None else (data[:, 0].min(), data[:, 0].max())
+        self.y_min, self.y_max = y_range if y_range is not None else (data[:, 1].min(), data[:, 1].max())
+
+        self.bins = bins
+        self.counts = None
+        self.n_samples = 0  # Samples held, in accumulator mode only the ones inside the range
+        if bins is None:
+            self.data = data
+            self.n_samples = len(data)
+        else:
+            self.data = None
+            self.xedges = np.linspace(self.x_min, self.x_max, bins + 1)
+            self.yedges = np.linspace(self.y_min, self.y_max, bins + 1)
+            self.counts = np.zeros((bins, bins), dtype=np.int64)
+            if data is not None:
+                self.update(data)
+
+    @classmethod
+    def from_chunks(cls, chunks, x_range, y_range, bins=1000, **kwargs):
+        """
+        Builds an estimator in accumulator mode from an iterator of coordinate chunks, e.g.
+
+            chunks = (df[['x_centered', 'y_centered']].values for df in pd.read_csv(path, chunksize=10**6))
+            rides = DensityEstimator.from_chunks(chunks, x_range, y_range, bins=1000)
+
+        Arguments:
+            chunks (iterable): Arrays of shape (n, 2) or DataFrames with two columns
+            x_range, y_range (tuple): Fixed (min, max) ranges of the histogram
+            bins (int): Number of bins per axis
+            **kwargs: Passed on to DensityEstimator(), e.g. bandwidth
+
+        Returns:
+            DensityEstimator: The estimator
+        """
+        estimator = cls(None, x_range=x_range, y_range=y_range, bins=bins, **kwargs)
+        for chunk in chunks:
+            estimator.update(chunk)
+        return estimator
+
+    def update(self, chunk):
+        """
+        Adds a chunk of coordinates to the accumulated histogram. Points outside the range are
+        ignored, as in np.histogram2d, and not counted in n_samples.
+
+        Arguments:
+            chunk (ndarray): Array of shape (n, 2) or DataFrame with two columns
+        """
+        if self.counts is None:
+            raise RuntimeError("update() requires the accumulator mode, create the estimator with bins.")
+
+        chunk = np.asarray(chunk, dtype=float)
+        ix = _bin_indices(chunk[:, 0], self.xedges)
+        iy = _bin_indices(chunk[:, 1], self.yedges)
+        inside = (ix >= 0) & (iy >= 0)
+        self.counts += np.bincount(ix[inside] * self.bins + iy[inside], minlength=self.bins ** 2).reshape(self.bins, self.bins)
+        self.n_samples += int(inside.sum())
+        self._kde_model = None
+        if self.bandwidth_method is not None:
+            # A selected bandwidth depends on the data, select it again on next use
+            self._bandwidth = self.bandwidth_method
+            self._bandwidth_selection = None
+
+    def _sample(self, size, random_state=0):
+        """
+        Draws points from the accumulated histogram, uniformly distributed within each bin.
+        """
+        rng = np.random.default_rng(random_state)
+        cells = rng.choice(self.counts.size, size=size, p=self.counts.ravel() / self.counts.sum())
+        ix, iy = np.divmod(cells, self.bins)
+        x = self.xedges[ix] + rng.random(size) * (self.xedges[1] - self.xedges[0])
+        y = self.yedges[iy] + rng.random(size) * (self.yedges[1] - self.yedges[0])
+        return np.column_stack([x, y])
+
+    def _select_bandwidth(self):
+        """
+        Runs the bandwidth selection for a bandwidth given as method name. In accumulator mode it
+        runs on a sample of the histogram and is scaled to the total count with the n^(-1/6) rate.
+        """
+        if self.data is not None:
+            bandwidth, info = select_bandwidth(
+                self.data, method=self.bandwidth_method, kernel=self.kernel, **self.bandwidth_options)
+        else:
+            total = int(self.counts.sum())
+            if total == 0:
+                raise RuntimeError("The bandwidth can not be selected before any data was added.")
+            size = min(total, 100000)
+            bandwidth, info = select_bandwidth(
+                self._sample(size), method=self.bandwidth_method, kernel=self.kernel, **self.bandwidth_options)
+            bandwidth = bandwidth * (total / size) ** (-1 / 6)
+            info['bandwidth'] = bandwidth
+
+        self._bandwidth = bandwidth
+        self._bandwidth_selection = info
+
+    @property
+    def bandwidth(self):
+        """
+        Bandwidth of the KDE, selected on first access if a method name was given.
+        """
+        if isinstance(self._bandwidth, str):
+            self._select_bandwidth()
+        return self._bandwidth
+
+    @property
+    def bandwidth_selection(self):
+        """
+        Chosen bandwidth and time spent, see select_bandwidth(), or None for a fixed bandwidth.
+        """
+        if isinstance(self._bandwidth, str):
+            self._select_bandwidth()
+        return self._bandwidth_selection
+
+    @property
+    def kde_model(self):
+        """
+        Sklearn KDE, fitted on first use. In accumulator mode it is fitted on the centers of the
+        non-empty bins weighted by their counts (a binned KDE).
+        """
+        if self._kde_model is None:
+            from sklearn.neighbors import KernelDensity
+
+            kde_model = KernelDensity(bandwidth=self.bandwidth, kernel=self.kernel)
+            if self.data is not None:
+                kde_model.fit(self.data)
+            else:
+                ix, iy = np.nonzero(self.counts)
+                if len(ix) == 0:
+                    raise RuntimeError("The KDE can not be fitted before any data was added.")
+                x_centers = (self.xedges[:-1] + self.xedges[1:]) / 2
+                y_centers = (self.yedges[:-1] + self.yedges[1:]) / 2
+                kde_model.fit(np.column_stack([x_centers[ix], y_centers[iy]]), sample_weight=self.counts[ix, iy])
+            self._kde_model = kde_model
+        return self._kde_model
+
+    def _histogram(self, hist_range, bins):
+        """
+        Counts the samples in bins over the given range. In accumulator mode the range and bins
+        have to match the accumulated histogram.
+
+        Returns:
+            H, xedges, yedges: Counts and bin edges
+        """
+        if self.counts is None:
+            bins = 1000 if bins is None else bins
+            return np.histogram2d(self.data[:, 0], self.data[:, 1], bins=bins, range=hist_range)
+
+        if bins is not None and bins != self.bins:
+            raise ValueError(f"The histogram was accumulated with {self.bins} bins, not {bins}.")
+        if not np.allclose(hist_range, [[self.x_min, self.x_max], [self.y_min, self.y_max]]):
+            raise ValueError("The histogram was accumulated over a different range.")
+
+        return self.counts.astype(float), self.xedges, self.yedges
+
+    def evaluate_grid(self, grid_size=1000, service_area=None):
         """
         Evaluates the KDE on a grid.
         
         Arguments:
             grid_size (int): Number of grid points per axis
+            service_area (ServiceArea): If given, the KDE is only evaluated at grid points inside the
+                service area, points outside are NaN
         
         Returns:
             xx, yy: Meshgrid arrays
@@ -44,81 +334,107 @@ class DensityEstimator():
         x_grid = np.linspace(self.x_min, self.x_max, grid_size)
         y_grid = np.linspace(self.y_min, self.y_max, grid_size)
         xx, yy = np.meshgrid(x_grid, y_grid)
-        grid_samples = np.vstack([xx.ravel(), yy.ravel()]).T
-        log_dens = self.kde_model.score_samples(grid_samples)
-        density = np.exp(log_dens).reshape(xx.shape)
+
+        if service_area is not None:
+            inside = service_area.grid_mask(x_grid, y_grid)
+        else:
+            inside = np.ones(xx.shape, dtype=bool)
+
+        grid_samples = np.column_stack([xx[inside], yy[inside]])
+        density = np.full(xx.shape, np.nan)
+        density[inside] = np.exp(self.kde_model.score_samples(grid_samples))
         
-        mid = np.median(density)
-        scale = np.std(density)
+        mid = np.nanmedian(density)
+        scale = np.nanstd(density)
         sigmoid = lambda x: (1 / (1 + np.exp(-(x - mid) / scale)) - 0.5) * 2
         normalized_density = sigmoid(density)
         return xx, yy, normalized_density
     
-    def histogram2d(self, bins=1000, density=False):
+    def histogram2d(self, bins=None, density=False, service_area=None):
         """
         Computes a 2D histogram (raster-based density estimation) from coordinate data.
         
         Arguments:
-            data (ndarray): Array of shape (n_samples, 2) (e.g., [[x, y], ...])
-            bins (int): Number of bins per axis
+            bins (int): Number of bins per axis, by default 1000 or the number of accumulated bins
+            density (bool): If True, the histogram is normalized to a probability density function
+            service_area (ServiceArea): If given, cells with their center outside the service area are set to 0
 
         Returns:
             H: 2D histogram array
             xedges, yedges: Bin edges
         """
-        x = self.data[:, 0]
-        y = self.data[:, 1]
-        H, xedges, yedges = np.histogram2d(
-            x, y, bins=bins, range=[[self.x_min, self.x_max], [self.y_min, self.y_max]], density=density)
+        H, xedges, yedges = self._histogram([[self.x_min, self.x_max], [self.y_min, self.y_max]], bins)
+        if density:
+            H = H / (H.sum() * np.diff(xedges)[:, None] * np.diff(yedges)[None, :])
+
+        if service_area is not None:
+            H = np.where(service_area.cell_mask(xedges, yedges), H, 0)
 
         return H, xedges, yedges
     
+    @staticmethod
+    def histogram2d_ratio(numerator: DensityEstimator, denominator: DensityEstimator, bins=None):
+        """
+        Normalizes one density estimate by dividing it by another. Both histograms are computed on
+        the range of the denominator, bins with a denominator count below 1 are set to 0.
+
+        Arguments:
+            numerator (DensityEstimator): Density to be normalized
+            denominator (DensityEstimator): Density used for normalization
+            bins (int): Number of bins to use along each axis for the 2D histogram, by default 1000 or
+                the number of accumulated bins
+
+        Returns:
+            H_norm (ndarray): The result of the division
+            xedges, yedges (ndarray): Bin edges
+        """
+        hist_range = [[denominator.x_min, denominator.x_max], [denominator.y_min, denominator.y_max]]
+        if bins is None:
+            bins = denominator.bins or numerator.bins
+
+        H_num, xedges_num, yedges_num = numerator._histogram(hist_range, bins)
+        H_den, xedges_den, yedges_den = denominator._histogram(hist_range, bins)
+
+        if not (np.array_equal(xedges_den, xedges_num) and np.array_equal(yedges_den, yedges_num)):
+            raise RuntimeError("Unexpected error: histogram bin edges do not match.")
+
+        H_norm = np.divide(H_num, H_den, out=np.zeros_like(H_num), where=H_den >= 1)
+
+        return H_norm, xedges_den, yedges_den
+
     @staticmethod
     def normalized_histogram2d(
         numerator: DensityEstimator, 
         denominator:DensityEstimator, 
-        bins=1000,
+        bins=None,
         title='Histogram Heatmap'):
         """
-        Normalizes one density estimate by dividing it by another.
+        Normalizes one density estimate by dividing it by another and plots the result.
         
         Arguments:
-            numerator (ndarray): Density to be normalized
-            denominator (ndarray): Density used for normalization
-            bins (int): Number of bins to use along each axis for the 2D histogram
+            numerator (DensityEstimator): Density to be normalized
+            denominator (DensityEstimator): Density used for normalization
+            bins (int): Number of bins to use along each axis for the 2D histogram, by default 1000 or
+                the number of accumulated bins
             title (str): Title of the heatmap
         
         Returns:
             normalized_density (ndarray): The result of the division
         """
-
-        x = numerator.data[:, 0]
-        y = numerator.data[:, 1]
-        H_num, xedges_num, yedges_num = np.histogram2d(
-            x, y, bins=bins, range=[[denominator.x_min, denominator.x_max], [denominator.y_min, denominator.y_max]])
-
-        x = denominator.data[:, 0]
-        y = denominator.data[:, 1]
-        H_den, xedges_den, yedges_den = np.histogram2d(
-            x, y, bins=bins, range=[[denominator.x_min, denominator.x_max], [denominator.y_min, denominator.y_max]])            
-
-        if (xedges_den == xedges_num).sum() !=  xedges_den.shape:
-            RuntimeError("Unexpected error: histogram bin edges to not match.")
-
-        safe_denom = np.where(H_den == 0, 1e-10, H_den)
-        H_norm = np.where(H_den < 1, 0, H_num/H_den)
-        # H_norm = H_num / (H_den+1) #safe_denom
+        H_norm, xedges, yedges = DensityEstimator.histogram2d_ratio(numerator, denominator, bins=bins)
 
         extent = [denominator.x_min, denominator.x_max, denominator.y_min, denominator.y_max]
-        DensityEstimator.plot_heatmap(H_norm, xedges_den, yedges_den, extent, title, density=True)
+        DensityEstimator.plot_heatmap(H_norm, xedges, yedges, extent, title, density=True)
 
+        return H_norm
 
-    def plot_histogram_heatmap(self, bins=1000, title='Histogram Heatmap', density=False):
+    def plot_histogram_heatmap(self, bins=None, title='Histogram Heatmap', density=False):
         """
         Computes a 2D histogram (raster-based density) and plots it as a heatmap.
  
          Arguments:
-            bins (int): Number of bins to use along each axis for the 2D histogram
+            bins (int): Number of bins to use along each axis for the 2D histogram, by default 1000 or
+                the number of accumulated bins
             title (str): Title for the heatmap plot
             density (bool): If True, H is interpreted as a normalized density (probability density function) and plotted accordingly; if False, H is treated as raw counts and plotted using logarithmic normalization   
         """
@@ -127,34 +443,13 @@ class DensityEstimator():
         extent = [self.x_min, self.x_max, self.y_min, self.y_max]
         self.plot_heatmap(H, xedges, yedges, extent, title, density)
 
-        
     @staticmethod
     def plot_heatmap(H, xedges, yedges, extent, title='Histogram Heatmap', density=False):
         """
-        Plots a 2D heatmap from a histogram array using matplotlib.
-
-        Arguments:
-            H (ndarray): 2D array containing histogram counts or density values
-            xedges (ndarray): Array of bin edges along the x-axis (not directly used, but typically provided)
-            yedges (ndarray): Array of bin edges along the y-axis (not directly used, but typically provided)
-            extent (list or tuple): The [x_min, x_max, y_min, y_max] boundaries for the plot
-            title (str): Title of the heatmap
-            density (bool): Flag indicating if H represents a probability density function (True) or raw counts (False)
-
+        Plots a 2D heatmap from a histogram array, see density_plotting.plot_heatmap().
         """
-        plt.figure(figsize=(10, 8))
-        if density:
-            plt.imshow(H.T, extent=extent, origin='lower')
-            plt.colorbar(label='Probability density function')
-        else:
-            plt.imshow(H.T, extent=extent, origin='lower', norm=LogNorm(vmin=1, vmax=H.max()))
-            plt.colorbar(label='Counts (log scale)')
-
-        plt.xlabel('x (meters)')
-        plt.ylabel('y (meters)')
-        plt.title(title)
-        plt.show()
-
+        from modeling import density_plotting
+        density_plotting.plot_heatmap(H, extent, title=title, density=density)
 
     def plot_kde_heatmap(self, grid_size=1000, title='KDE Heatmap', show_scatter=False):
         """
@@ -165,15 +460,9 @@ class DensityEstimator():
             title (str): Title of the plot
             show_scatter (bool): If True, overlays the original data points
         """
+        from modeling import density_plotting
 
         xx, yy, density = self.evaluate_grid(grid_size=grid_size)
-        plt.figure(figsize=(10, 8))
-        plt.imshow(density, extent=[self.x_min, self.x_max, self.y_min, self.y_max],
-                   origin='lower', aspect='auto')
-        plt.colorbar(label='Normalized Density')
-        if show_scatter and self.data is not None:
-            plt.scatter(self.data[:, 0], self.dataX[:, 1], s=1, c='blue', alpha=0.3)
-        plt.xlabel("x (meters)")
-        plt.ylabel("y (meters)")
-        plt.title(title)
-        plt.show()
\ No newline at end of file
+        extent = [self.x_min, self.x_max, self.y_min, self.y_max]
+        scatter = self.data if show_scatter else None
+        density_plotting.plot_kde_heatmap(density, extent, title=title, scatter=scatter)
@@ -0,0 +1,47 @@
+import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
+
+
+def plot_heatmap(H, extent, title='Histogram Heatmap', density=False):
+    """
+    Plots a 2D heatmap from a histogram array using matplotlib.
+
+    Arguments:
+        H (ndarray): 2D array containing histogram counts or density values
+        extent (list or tuple): The [x_min, x_max, y_min, y_max] boundaries for the plot
+        title (str): Title of the heatmap
+        density (bool): Flag indicating if H represents a probability density function (True) or raw counts (False)
+    """
+    plt.figure(figsize=(10, 8))
+    if density:
+        plt.imshow(H.T, extent=extent, origin='lower')
+        plt.colorbar(label='Probability density function')
+    else:
+        plt.imshow(H.T, extent=extent, origin='lower', norm=LogNorm(vmin=1, vmax=H.max()))
+        plt.colorbar(label='Counts (log scale)')
+
+    plt.xlabel('x (meters)')
+    plt.ylabel('y (meters)')
+    plt.title(title)
+    plt.show()
+
+
+def plot_kde_heatmap(density, extent, title='KDE Heatmap', scatter=None):
+    """
+    Plots a KDE-estimated density evaluated on a grid as a heatmap.
+
+    Arguments:
+        density (ndarray): 2D array of density values as returned by DensityEstimator.evaluate_grid()
+        extent (list or tuple): The [x_min, x_max, y_min, y_max] boundaries for the plot
+        title (str): Title of the plot
+        scatter (ndarray): Optional array of shape (n_samples, 2) with data points to overlay
+    """
+    plt.figure(figsize=(10, 8))
+    plt.imshow(density, extent=extent, origin='lower', aspect='auto')
+    plt.colorbar(label='Normalized Density')
+    if scatter is not None:
+        plt.scatter(scatter[:, 0], scatter[:, 1], s=1, c='blue', alpha=0.3)
+    plt.xlabel("x (meters)")
+    plt.ylabel("y (meters)")
+    plt.title(title)
+    plt.show()
@@ -0,0 +1,28 @@
+import os
+
+
+def file_fingerprint(path):
+    """
+    Describes a file or directory by its paths, sizes and modification times, e.g. to detect that
+    input data changed.
+
+    Arguments:
+        path (str): Path to a file or directory
+
+    Returns:
+        list: Sorted (path, size, mtime_ns) tuples of the file or of all files in the directory
+
+    Raises:
+        FileNotFoundError: If the path does not exist
+    """
+    entries = []
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            for file in sorted(files):
+                file_path = os.path.join(root, file)
+                stat = os.stat(file_path)
+                entries.append((file_path, stat.st_size, stat.st_mtime_ns))
+    else:
+        stat = os.stat(path)
+        entries.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    return sorted(entries)
@@ -0,0 +1,217 @@
+import time
+import threading
+import numpy as np
+
+from modeling.fingerprint import file_fingerprint
+
+
+class ReloadingPriceCalculator():
+    """
+    Long-lived price calculator that watches its model and data sources and swaps in a rebuilt
+    PriceCalculator when they change. The replacement is built and validated in a background
+    thread while quotes keep being served by the current calculator. Each quote reads the current
+    calculator exactly once, so it sees either the old or the new version but never a mix of both.
+    If building or validating the replacement fails, the current version stays active.
+    """
+
+    def __init__(self, factory, sources, probes=None, validate=None, poll_interval=5.0, log=None):
+        """
+        Arguments:
+            factory (callable): Builds a new PriceCalculator, e.g. lambda: PriceCalculator(model_path, CitibikeDataset(path))
+            sources (list): Files or directories the factory reads, a change of any of them triggers a reload
+            probes (tuple): Optional (started_at, start_station_ids) quoted with every new calculator,
+                a version is rejected unless all probe prices are finite and non-negative
+            validate (callable): Optional check validate(new, old) returning False or raising to reject a version
+            poll_interval (float): Seconds between checks of the sources in the background thread
+            log (callable): Optional function called with a message after every reload attempt, e.g. print
+        """
+        self.factory = factory
+        self.sources = list(sources)
+        self.probes = probes
+        self.validate = validate
+        self.poll_interval = poll_interval
+        self.log = log
+
+        self.version = 0
+        self.history = []
+        self._reload_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+        self._calculator = None
+        self._source_fingerprint = None
+        self.reload(force=True)
+        if self._calculator is None:
+            raise RuntimeError(f"The initial price calculator could not be built: {self.history[-1]['error']}")
+
+    @classmethod
+    def from_snapshot(cls, path, traffic_counter=None, **kwargs):
+        """
+        Creates a calculator that reloads whenever the pricing snapshot is replaced, e.g. by a
+        training job writing a new snapshot and renaming it over the old one.
+
+        Arguments:
+            path (str): Path to the pricing snapshot (see PriceCalculator.save_snapshot())
+            traffic_counter (SlidingWindowTrafficCounter): Optional live traffic counter shared by all versions
+            **kwargs: Passed on to ReloadingPriceCalculator()
+
+        Returns:
+            ReloadingPriceCalculator: The calculator
+        """
+        from modeling.price_calculator import PriceCalculator
+
+        return cls(lambda: PriceCalculator.from_snapshot(path, traffic_counter=traffic_counter), [path], **kwargs)
+
+    @property
+    def calculator(self):
+        """
+        The currently active PriceCalculator.
+        """
+        return self._calculator
+
+    def _fingerprint(self):
+        """
+        Describes the current state of all sources, missing sources are recorded as None.
+        """
+        fingerprint = []
+        for source in self.sources:
+            try:
+                fingerprint.append(file_fingerprint(source))
+            except FileNotFoundError:
+                fingerprint.append(None)
+        return fingerprint
+
+    def changed(self):
+        """
+        Checks whether any source changed since the active version was built.
+
+        Returns:
+            bool: True if a reload is due
+        """
+        return self._fingerprint() != self._source_fingerprint
+
+    def _check(self, calculator, current):
+        """
+        Warms up the lazily built tables of a new calculator and validates it.
+
+        Raises:
+            ValueError: If the probe quotes are invalid or the custom validation fails
+        """
+        calculator.warm_up()
+
+        if self.probes is not None:
+            prices, _ = calculator.predict_insurance_prices(*self.probes)
+            if len(prices) == 0 or not np.all(np.isfinite(prices)) or np.any(prices < 0):
+                raise ValueError("Probe quotes of the new version are not finite and non-negative.")
+
+        if self.validate is not None and self.validate(calculator, current) is False:
+            raise ValueError("The new version was rejected by the validation function.")
+
+    def reload(self, force=False):
+        """
+        Builds, validates and activates a new calculator if the sources changed. Blocks until the
+        reload is finished, quotes are served by the current version meanwhile.
+
+        Arguments:
+            force (bool): Reload even if no source changed
+
+        Returns:
+            bool: True if a new version was activated
+        """
+        with self._reload_lock:
+            fingerprint = self._fingerprint()
+            if not force and self._calculator is not None and fingerprint == self._source_fingerprint:
+                return False
+
+            start = time.perf_counter()
+            record = {'version': self.version + 1, 'started_at': time.time()}
+            try:
+                calculator = self.factory()
+                self._check(calculator, self._calculator)
+            except Exception as e:
+                record.update(status='failed', error=f"{type(e).__name__}: {e}",
+                              seconds=time.perf_counter() - start, active_version=self.version)
+                # Remember the failed sources, so the same broken files are not rebuilt on every poll
+                if self._calculator is not None:
+                    self._source_fingerprint = fingerprint
+                self.history.append(record)
+                self._report(record)
+                return False
+
+            # A single reference assignment, quotes in flight keep using the calculator they read
+            self._calculator = calculator
+            self._source_fingerprint = fingerprint
+            self.version += 1
+            record.update(status='ok', seconds=time.perf_counter() - start, active_version=self.version)
+            self.history.append(record)
+            self._report(record)
+            return True
+
+    def _report(self, record):
+        """
+        Passes a reload record to the log function.
+        """
+        if self.log is None:
+            return
+        if record['status'] == 'ok':
+            self.log(f"Pricing version {record['version']} activated, reload took {record['seconds']:.2f}s.")
+        else:
+            self.log(f"Reload failed after {record['seconds']:.2f}s, keeping version {record['active_version']}: "
+                     f"{record['error']}")
+
+    @property
+    def status(self):
+        """
+        Active version and the outcome of the last reload attempt.
+        """
+        last = self.history[-1]
+        return {
+            'version': self.version,
+            'last_status': last['status'],
+            'last_reload_seconds': last['seconds'],
+            'last_error': last.get('error'),
+            'n_reloads': sum(record['status'] == 'ok' for record in self.history),
+            'n_failed_reloads': sum(record['status'] == 'failed' for record in self.history),
+        }
+
+    def start(self):
+        """
+        Polls the sources in a background thread and reloads when they change.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.poll_interval):
+                self.reload()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stops the background thread started with start() after its current reload.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def predict_insurance_prices(self, started_at, start_station_ids):
+        """
+        See PriceCalculator.predict_insurance_prices().
+        """
+        return self._calculator.predict_insurance_prices(started_at, start_station_ids)
+
+    def predict_insurance_price(self, started_at, start_station_id):
+        """
+        See PriceCalculator.predict_insurance_price().
+        """
+        return self._calculator.predict_insurance_price(started_at, start_station_id)
+
+    def predict_insurance_price_at(self, started_at, lat, lng, k=1, max_distance=500):
+        """
+        See PriceCalculator.predict_insurance_price_at().
+        """
+        return self._calculator.predict_insurance_price_at(started_at, lat, lng, k=k, max_distance=max_distance)
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+def _simulate_chunk(expected_crashes, n_scenarios, cost_per_accident, severity_sigma, method, seed, memory_budget):
+    """
+    Simulates the total loss of a portfolio for a chunk of scenarios.
+
+    Arguments:
+        expected_crashes (ndarray): Non-negative expected number of crashes of each ride
+        n_scenarios (int): Number of scenarios in this chunk
+        cost_per_accident (float): Mean cost of a crash
+        severity_sigma (float): Sigma of the lognormal crash cost, 0 gives a fixed cost per crash
+        method (str): 'poisson' or 'bernoulli', see PortfolioLossSimulator
+        seed (SeedSequence): Seed of this chunk
+        memory_budget (int): Bytes the random draws of the 'bernoulli' method may use at once
+
+    Returns:
+        ndarray: Total loss of each scenario
+    """
+    rng = np.random.default_rng(seed)
+
+    if method == 'poisson':
+        # A sum of independent Poisson counts is Poisson with the summed rate, and with iid crash
+        # costs only the number of crashes per scenario matters, so no draws per ride are needed
+        n_crashes = rng.poisson(expected_crashes.sum(), size=n_scenarios)
+    elif method == 'bernoulli':
+        p = np.minimum(expected_crashes, 1)
+        n_crashes = np.zeros(n_scenarios, dtype=np.int64)
+        # Each draw takes a float64 plus a bool for the comparison
+        ride_chunk_size = max(1, int(memory_budget // (9 * n_scenarios)))
+        for start in range(0, len(p), ride_chunk_size):
+            p_chunk = p[start:start + ride_chunk_size]
+            n_crashes += (rng.random((n_scenarios, len(p_chunk))) < p_chunk).sum(axis=1)
+    else:
+        raise ValueError(f"Unknown method '{method}'. Use 'poisson' or 'bernoulli'.")
+
+    if severity_sigma == 0:
+        return n_crashes * float(cost_per_accident)
+
+    # Lognormal costs with mean cost_per_accident, summed per scenario
+    mu = np.log(cost_per_accident) - severity_sigma ** 2 / 2
+    costs = rng.lognormal(mu, severity_sigma, size=n_crashes.sum())
+    scenario = np.repeat(np.arange(n_scenarios), n_crashes)
+
+    return np.bincount(scenario, weights=costs, minlength=n_scenarios)
+
+
+class PortfolioLossSimulator():
+    """
+    Monte Carlo simulation of the total claims of a portfolio of priced rides, e.g. all rides of a
+    day or month from a batch pricing run. Crash occurrences and costs are drawn for many scenarios
+    with vectorized NumPy, chunked over scenarios to bound memory and optionally in parallel.
+    """
+
+    def __init__(self, risk_per_ride, cost_per_accident=5000, traffic_adjustment=0.001, severity_sigma=1.0,
+                 premiums=None, method='poisson', chunk_size=1000, memory_budget=64 * 2 ** 20, n_jobs=1,
+                 random_state=None):
+        """
+        Arguments:
+            risk_per_ride (array-like): Risk per ride as returned by PriceCalculator.predict_insurance_prices(),
+                NaN entries are ignored and negative model predictions count as zero risk
+            cost_per_accident (float): Mean cost of a crash
+            traffic_adjustment (float): Factor turning the risk per ride into expected crashes per ride,
+                use the traffic_adjustment of the PriceCalculator the rides were priced with
+            severity_sigma (float): Sigma of the lognormal crash cost, 0 gives a fixed cost per crash
+            premiums (array-like): Insurance prices of the rides, used to assess premium adequacy
+            method (str): 'poisson' draws Poisson crash counts per ride, which only requires one draw
+                per scenario; 'bernoulli' draws at most one crash per ride with probability
+                min(expected crashes, 1), which requires one draw per ride and scenario
+            chunk_size (int): Number of scenarios simulated at once
+            memory_budget (int): Bytes the random draws of a scenario chunk may use with the
+                'bernoulli' method, the rides are drawn in chunks that fit
+            n_jobs (int): Number of parallel jobs over scenario chunks, -1 uses all cores
+            random_state (int): Seed, results do not depend on n_jobs or chunk order
+        """
+        risk_per_ride = np.asarray(risk_per_ride, dtype=float)
+        risk_per_ride = risk_per_ride[~np.isnan(risk_per_ride)]
+        self.expected_crashes = np.clip(risk_per_ride * traffic_adjustment, 0, None)
+        self.cost_per_accident = cost_per_accident
+        self.traffic_adjustment = traffic_adjustment
+        self.severity_sigma = severity_sigma
+        self.total_premium = None if premiums is None else np.nansum(np.asarray(premiums, dtype=float))
+        self.method = method
+        self.chunk_size = chunk_size
+        self.memory_budget = memory_budget
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.losses = None
+
+    def simulate(self, n_scenarios=10000):
+        """
+        Simulates the total loss of the portfolio.
+
+        Arguments:
+            n_scenarios (int): Number of scenarios
+
+        Returns:
+            ndarray: Total loss of each scenario
+        """
+        chunk_sizes = [min(self.chunk_size, n_scenarios - start) for start in range(0, n_scenarios, self.chunk_size)]
+        seeds = np.random.SeedSequence(self.random_state).spawn(len(chunk_sizes))
+        args = (self.cost_per_accident, self.severity_sigma, self.method)
+
+        if self.n_jobs == 1:
+            results = [_simulate_chunk(self.expected_crashes, size, *args, seed, self.memory_budget)
+                       for size, seed in zip(chunk_sizes, seeds)]
+        else:
+            from joblib import Parallel, delayed
+            results = Parallel(n_jobs=self.n_jobs)(
+                delayed(_simulate_chunk)(self.expected_crashes, size, *args, seed, self.memory_budget)
+                for size, seed in zip(chunk_sizes, seeds)
+            )
+
+        self.losses = np.concatenate(results) if results else np.zeros(0)
+        return self.losses
+
+    def summary(self, quantiles=(0.5, 0.9, 0.95, 0.99, 0.995)):
+        """
+        Summarizes the simulated loss distribution, simulate() has to be called first.
+
+        Arguments:
+            quantiles (tuple): Loss quantiles to report
+
+        Returns:
+            dict: With the keys
+                - 'expected_loss': Analytical expected loss (sum of expected crashes times cost per accident)
+                - 'mean_loss', 'std_loss': Mean and standard deviation of the simulated losses
+                - 'quantiles': Dict mapping each quantile to its loss
+                - 'total_premium', 'premium_adequacy' (probability that the premiums cover the
+                  loss) and 'loss_ratio' (expected loss / premium), if premiums were given
+        """
+        if self.losses is None:
+            raise RuntimeError("No simulated losses. Run simulate() first.")
+
+        expected_crashes = np.minimum(self.expected_crashes, 1) if self.method == 'bernoulli' else self.expected_crashes
+        expected_loss = float(expected_crashes.sum() * self.cost_per_accident)
+        result = {
+            'n_scenarios': len(self.losses),
+            'n_rides': len(self.expected_crashes),
+            'expected_loss': expected_loss,
+            'mean_loss': float(self.losses.mean()),
+            'std_loss': float(self.losses.std()),
+            'quantiles': dict(zip(quantiles, np.quantile(self.losses, quantiles).tolist())),
+        }
+
+        if self.total_premium is not None:
+            result['total_premium'] = float(self.total_premium)
+            result['premium_adequacy'] = float(np.mean(self.losses <= self.total_premium))
+            result['loss_ratio'] = expected_loss / self.total_premium if self.total_premium > 0 else np.inf
+
+        return result
@@ -1,6 +1,10 @@
+import os
 import numpy as np
+import pandas as pd
 from datetime import datetime
 import pickle
+from datasets.citibike_dataset import CitibikeDataset
+from modeling.station_locator import StationLocator
 
 class PriceCalculator:
     """
@@ -10,23 +14,85 @@ class PriceCalculator:
     starting at the concidered station in that considered time bin.
     """
     
-    def __init__(self, model_path, citibike_dataset, time_bin_size=30, cost_per_accident=5000, traffic_adjustment=0.001):
+    def __init__(self, model_path, citibike_dataset, time_bin_size=30, cost_per_accident=5000, traffic_adjustment=0.001,
+                 traffic_counter=None, traffic_table=None):
         """
         Initializes the CrashRiskCalculator.
         
         Arguments:
-            model_path (str): Path to the saved model (e.g., "fitted_models/my_model.pkl")
+            model_path (str): Path to the saved model (e.g., "fitted_models/my_model.pkl"), or an already loaded model
             citibike_dataset (CitibikeDataset): Dataset to calculate traffic 
             time_bin_size (int): Size of the time bin in minutes (default is 30)
             cost_per_accident (float): Fixed estimated average cost per crash (default is 5000)
             traffic_adjustment (float): Tuneable factor to account for mismatch of crash counts and traffic and for varying traffic numbers due to dataset size. 
+            traffic_counter (SlidingWindowTrafficCounter): Optional live traffic counter that is used instead of scanning the rides of the dataset. Its time_bin_size has to match.
+            traffic_table (ndarray): Optional precomputed traffic table (see traffic_table), then the dataset needs no rides
         """
-        self.model = pickle.load(open(model_path, 'rb'))
+        if isinstance(model_path, (str, os.PathLike)):
+            with open(model_path, 'rb') as f:
+                self.model = pickle.load(f)
+        else:
+            self.model = model_path
         self.citibike_dataset = citibike_dataset
         self.time_bin_size = time_bin_size
         self.cost_per_accident = cost_per_accident
         self.traffic_adjustment = traffic_adjustment
+        self._station_locator = None
+        self._station_index = None
+        self._traffic_table = traffic_table
+        self.traffic_counter = traffic_counter
+        self.snapshot_meta = None
+
+        if traffic_counter is not None and traffic_counter.time_bin_size != time_bin_size:
+            raise ValueError("The time_bin_size of the traffic counter does not match the calculator.")
     
+    @classmethod
+    def from_snapshot(cls, path, traffic_counter=None):
+        """
+        Creates a calculator from a pricing snapshot (see save_snapshot()) without loading any
+        ride data. The returned calculator holds only the stations and the traffic table.
+
+        Arguments:
+            path (str): Path to the snapshot
+            traffic_counter (SlidingWindowTrafficCounter): Optional live traffic counter
+
+        Returns:
+            PriceCalculator: The calculator
+        """
+        from modeling.pricing_snapshot import load_pricing_snapshot
+
+        arrays, meta = load_pricing_snapshot(path)
+
+        stations = pd.DataFrame({
+            'station_id': arrays['station_ids'],
+            'lat': arrays['station_latlng'][:, 0],
+            'lng': arrays['station_latlng'][:, 1],
+            'x_centered': arrays['station_xy'][:, 0],
+            'y_centered': arrays['station_xy'][:, 1],
+        })
+
+        calculator = cls(
+            arrays['model'], CitibikeDataset.from_stations(stations, meta['x_center'], meta['y_center']),
+            time_bin_size=meta['time_bin_size'], cost_per_accident=meta['cost_per_accident'],
+            traffic_adjustment=meta['traffic_adjustment'], traffic_counter=traffic_counter,
+            traffic_table=arrays['traffic']
+        )
+        calculator.snapshot_meta = meta
+
+        return calculator
+
+    def save_snapshot(self, path):
+        """
+        Writes a versioned, checksummed pricing snapshot with the stations, traffic table, model and
+        pricing config, so that quoting does not need the Citibike dataset (see from_snapshot()).
+
+        Arguments:
+            path (str): Output path (.npz)
+        """
+        from modeling.pricing_snapshot import save_pricing_snapshot
+
+        save_pricing_snapshot(self, path)
+
     def convert_time_to_minutes(self, dt):
         """
         Converts a datetime object to minutes since midnight.
@@ -54,6 +120,159 @@ class PriceCalculator:
 
         return time_bin * self.time_bin_size + self.time_bin_size / 2
     
+    @property
+    def station_locator(self):
+        """
+        Spatial index over the stations of the dataset, built on first use.
+        """
+        if self._station_locator is None:
+            self._station_locator = StationLocator.from_dataset(self.citibike_dataset)
+        return self._station_locator
+
+    @property
+    def station_index(self):
+        """
+        Index mapping station ids (as strings) to row positions of the stations DataFrame, built on first use.
+        """
+        if self._station_index is None:
+            self._station_index = pd.Index(self.citibike_dataset.stations['station_id'].astype(str))
+        return self._station_index
+
+    @property
+    def traffic_table(self):
+        """
+        Array of shape (n_stations, n_time_bins) with the number of ride starts plus ride ends per
+        station and time bin, computed once from the rides of the dataset.
+        """
+        if self._traffic_table is None:
+            n_stations = len(self.station_index)
+            n_bins = int(np.ceil(24 * 60 / self.time_bin_size))
+            df_rides = self.citibike_dataset.df_rides
+
+            counts = np.zeros(n_stations * n_bins, dtype=np.int64)
+            for id_column, time_column in [('start_station_id', 'started_at'), ('end_station_id', 'ended_at')]:
+                station_idx = self.station_index.get_indexer(df_rides[id_column].astype(str))
+                times = pd.to_datetime(df_rides[time_column], format='ISO8601', errors='coerce')
+                # Rides with unparseable times (NaT) are not counted
+                known = (station_idx >= 0) & times.notna().values
+                minutes = (times.dt.hour * 60 + times.dt.minute).fillna(0).astype(np.int64)
+                bins = (minutes // self.time_bin_size).values
+                counts += np.bincount(station_idx[known] * n_bins + bins[known], minlength=n_stations * n_bins)
+
+            self._traffic_table = counts.reshape(n_stations, n_bins)
+        return self._traffic_table
+
+    def warm_up(self):
+        """
+        Builds the lazily computed station index and, without a live traffic counter, the traffic
+        table, so that the first quotes do not pay for them.
+        """
+        self._station_index = self.station_index
+        if self.traffic_counter is None:
+            self._traffic_table = self.traffic_table
+
+    def _station_traffic(self, station_id, bin_index):
+        """
+        Counts the rides starting or ending at a station in the given time bin.
+
+        Arguments:
+            station_id (str): Citibike id of the station
+            bin_index (int): Index of the time bin
+
+        Returns:
+            int: Number of ride starts plus ride ends
+        """
+        if self.traffic_counter is not None:
+            return self.traffic_counter.count(station_id, bin_index)
+
+        station_idx = self.station_index.get_indexer([str(station_id)])[0]
+        if station_idx < 0:
+            return 0
+        return int(self.traffic_table[station_idx, bin_index])
+
+    def _traffic(self, station_idx, bin_idx):
+        """
+        Vectorized version of _station_traffic() for station row positions and time bins.
+
+        Arguments:
+            station_idx (ndarray): Row positions in the stations DataFrame
+            bin_idx (ndarray): Indices of the time bins
+
+        Returns:
+            ndarray: Number of ride starts plus ride ends
+        """
+        if self.traffic_counter is not None:
+            station_ids = self.station_index[station_idx]
+            return np.array([self.traffic_counter.count(station_id, bin_index)
+                             for station_id, bin_index in zip(station_ids, bin_idx)], dtype=np.int64)
+
+        return self.traffic_table[station_idx, bin_idx]
+
+    def _predict_risks(self, station_idx, minutes):
+        """
+        Predicts the risk per ride for rides starting at the given stations and times.
+
+        Arguments:
+            station_idx (ndarray): Row positions of the start stations in the stations DataFrame
+            minutes (ndarray): Start times in minutes since midnight
+
+        Returns:
+            ndarray: The predicted risk per ride (crashes per start)
+        """
+        stations = self.citibike_dataset.stations
+        bin_idx = minutes // self.time_bin_size
+        time_center = bin_idx * self.time_bin_size + self.time_bin_size / 2
+
+        X = np.column_stack([
+            stations['x_centered'].values[station_idx],
+            stations['y_centered'].values[station_idx],
+            time_center
+        ])
+        predicted_crash_counts = np.asarray(self.model.predict(X), dtype=float)
+        traffic = self._traffic(station_idx, bin_idx)
+
+        return np.where(traffic > 0, predicted_crash_counts / np.maximum(traffic, 1), predicted_crash_counts)
+
+    def _predict_station_risks(self, started_at, station_rows):
+        """
+        Predicts the risk per ride for rides starting at the given stations at the same time.
+
+        Arguments:
+            started_at (datetime): The ride's start time
+            station_rows (DataFrame): Rows of the stations DataFrame
+
+        Returns:
+            ndarray: The predicted risk per ride for each station
+        """
+        minutes = self.convert_time_to_minutes(started_at)
+        station_idx = self.station_index.get_indexer(station_rows['station_id'].astype(str))
+
+        return self._predict_risks(station_idx, np.full(len(station_idx), minutes))
+
+    def predict_insurance_prices(self, started_at, start_station_ids):
+        """
+        Predicts the insurance prices for many rides at once with a single model call.
+
+        Arguments:
+            started_at (array-like): The rides' start times
+            start_station_ids (array-like): Citibike ids of the start stations
+
+        Returns:
+            tuple: A tuple (insurance_prices, risks_per_ride) of arrays, see predict_insurance_price().
+            Rides starting at unknown stations or with missing or unparseable start times get NaN.
+        """
+        started_at = pd.to_datetime(pd.Series(started_at), format='ISO8601', errors='coerce')
+        minutes = (started_at.dt.hour * 60 + started_at.dt.minute).fillna(0).astype(np.int64).values
+        station_idx = self.station_index.get_indexer(pd.Series(start_station_ids).astype(str))
+        known = (station_idx >= 0) & started_at.notna().values
+
+        risks_per_ride = np.full(len(station_idx), np.nan)
+        if known.any():
+            risks_per_ride[known] = self._predict_risks(station_idx[known], minutes[known])
+        insurance_prices = risks_per_ride * self.cost_per_accident * self.traffic_adjustment
+
+        return insurance_prices, risks_per_ride
+
     def predict_insurance_price(self, started_at, start_station_id):
         """
         Predicts the insurance price for a single ride.
@@ -67,36 +286,50 @@ class PriceCalculator:
                 - insurance_price (float): The calculated insurance price
                 - risk_per_ride (float): The predicted risk per ride (crashes per start)
         """
+        stations = self.citibike_dataset.stations
+        station_row = stations[stations["station_id"] == start_station_id]
+        if station_row.empty:
+            raise ValueError(f"Unknown start station id '{start_station_id}'. "
+                             "Use predict_insurance_price_at() to price rides from coordinates.")
 
-        minutes = self.convert_time_to_minutes(started_at)
-        time_center = self.get_time_bin_center(minutes)
-        
-        station_row = self.citibike_dataset.stations[self.citibike_dataset.stations["station_id"] == start_station_id]
-        x_centered = station_row['x_centered'].iloc[0]
-        y_centered = station_row['y_centered'].iloc[0]
-        X = np.array([[x_centered, y_centered, time_center]])
-
-        predicted_crash_count = self.model.predict(X)[0]
-
-        station_id = station_row['station_id']
-        bin_index = minutes // self.time_bin_size
+        risk_per_ride = self._predict_station_risks(started_at, station_row.iloc[:1])[0]
+        insurance_price = risk_per_ride * self.cost_per_accident * self.traffic_adjustment
 
-        def time_bin(dt):
-            return (dt.hour * 60 + dt.minute) // self.time_bin_size
+        return insurance_price, risk_per_ride
 
-        rides_station = self.citibike_dataset.df_rides[self.citibike_dataset.df_rides['start_station_id'] == start_station_id]
-        num_starts = rides_station['started_at'].apply(time_bin).eq(bin_index).sum()
+    def predict_insurance_price_at(self, started_at, lat, lng, k=1, max_distance=500):
+        """
+        Predicts the insurance price for a ride starting at arbitrary coordinates (e.g. dockless
+        e-bikes or new stations). With k=1 the ride is snapped to the nearest station, otherwise the 
+        risk is interpolated between the k nearest stations by inverse distance weighting.
+        
+        Arguments:
+            started_at (datetime): The ride's start time
+            lat (float): Latitude of the start position
+            lng (float): Longitude of the start position
+            k (int): Number of nearest stations to use
+            max_distance (float): Only stations within this distance in meters on the ground are used
+            
+        Returns:
+            tuple: A tuple (insurance_price, risk_per_ride), see predict_insurance_price()
+        """
+        locator = self.station_locator
+        xy = locator.project(lat, lng)
+        distances, indices = locator.query(xy, k=k)
+        # Projected distances to meters on the ground
+        distances, indices = distances[0] / locator.scale(xy)[0], indices[0]
 
-        rides_station = self.citibike_dataset.df_rides[self.citibike_dataset.df_rides['end_station_id'] == start_station_id]
-        num_ends = rides_station['ended_at'].apply(time_bin).eq(bin_index).sum()
+        within = distances <= max_distance
+        if not within.any():
+            raise ValueError(f"No station within {max_distance} meters of ({lat}, {lng}).")
+        distances, indices = distances[within], indices[within]
 
-        traffic = num_starts + num_ends
+        station_rows = self.citibike_dataset.stations.iloc[indices]
+        risks = self._predict_station_risks(started_at, station_rows)
 
-        if traffic > 0:
-            risk_per_ride = predicted_crash_count / traffic
-        else:
-            risk_per_ride = predicted_crash_count
-        
+        # Inverse distance weights, a station at the exact position gets all the weight
+        weights = 1 / np.maximum(distances, 1e-6)
+        risk_per_ride = float(np.sum(weights * risks) / np.sum(weights))
         insurance_price = risk_per_ride * self.cost_per_accident * self.traffic_adjustment
 
-        return insurance_price, risk_per_ride
\ No newline at end of file
+        return insurance_price, risk_per_ride
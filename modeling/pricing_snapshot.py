@@ -0,0 +1,98 @@
+import io
+import os
+import json
+import time
+import pickle
+import hashlib
+import numpy as np
+
+
+FORMAT_VERSION = 1
+
+# Arrays in the order they enter the checksum
+ARRAY_KEYS = ['station_ids', 'station_xy', 'station_latlng', 'traffic', 'model']
+
+
+def _checksum(arrays, meta):
+    """
+    Computes the SHA-256 checksum over all arrays and the metadata (without the checksum itself).
+    """
+    digest = hashlib.sha256()
+    for key in ARRAY_KEYS:
+        array = np.ascontiguousarray(arrays[key])
+        digest.update(key.encode())
+        digest.update(str(array.dtype).encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    digest.update(json.dumps({k: v for k, v in meta.items() if k != 'checksum'}, sort_keys=True).encode())
+
+    return digest.hexdigest()
+
+
+def save_pricing_snapshot(calculator, path):
+    """
+    Writes everything a PriceCalculator needs for quoting into one compressed file: station ids and
+    coordinates, the dataset center, the station x time bin traffic table, the pickled model and
+    the pricing config, together with a format version and a checksum.
+
+    Arguments:
+        calculator (PriceCalculator): Calculator to snapshot, its traffic table is computed if needed
+        path (str): Output path (.npz), an existing snapshot is replaced atomically
+    """
+    dataset = calculator.citibike_dataset
+    stations = dataset.stations
+
+    latlng_columns = ['lat', 'lng'] if {'lat', 'lng'}.issubset(stations.columns) else []
+    arrays = {
+        'station_ids': np.asarray(calculator.station_index, dtype=str),
+        'station_xy': stations[['x_centered', 'y_centered']].values.astype(np.float64),
+        'station_latlng': stations[latlng_columns].values.astype(np.float64) if latlng_columns
+                          else np.full((len(stations), 2), np.nan),
+        'traffic': calculator.traffic_table.astype(np.int32),
+        'model': np.frombuffer(pickle.dumps(calculator.model, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8),
+    }
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'x_center': float(dataset.x_center),
+        'y_center': float(dataset.y_center),
+        'time_bin_size': calculator.time_bin_size,
+        'cost_per_accident': calculator.cost_per_accident,
+        'traffic_adjustment': calculator.traffic_adjustment,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    meta['checksum'] = _checksum(arrays, meta)
+
+    # Write to a temporary file first, readers (e.g. a ReloadingPriceCalculator) never see a partial snapshot
+    tmp_path = os.fspath(path) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_pricing_snapshot(path):
+    """
+    Reads and verifies a snapshot written by save_pricing_snapshot().
+
+    Arguments:
+        path (str): Path to the snapshot
+
+    Returns:
+        tuple: (arrays, meta), the model is returned unpickled as arrays['model']
+
+    Raises:
+        ValueError: If the format version is unsupported or the checksum does not match
+    """
+    with open(path, 'rb') as f:
+        with np.load(io.BytesIO(f.read()), allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {key: data[key] for key in ARRAY_KEYS}
+
+    if meta.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported pricing snapshot version {meta.get('format_version')}, "
+                         f"expected {FORMAT_VERSION}.")
+    if _checksum(arrays, meta) != meta.get('checksum'):
+        raise ValueError(f"Checksum mismatch, the pricing snapshot '{path}' is corrupted.")
+
+    arrays['model'] = pickle.loads(arrays['model'].tobytes())
+
+    return arrays, meta
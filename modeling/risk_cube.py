@@ -0,0 +1,180 @@
+import numpy as np
+
+
+class RiskCube():
+    """
+    Crash model predictions precomputed on a regular (x, y, time of day) grid. The model is
+    evaluated once when building the cube, afterwards batched point queries are answered by
+    vectorized trilinear or nearest neighbor interpolation. Time of day is periodic, so 23:50 is
+    interpolated between the last and the first time node.
+    """
+
+    MINUTES_PER_DAY = 24 * 60
+
+    def __init__(self, values, x_range, y_range):
+        """
+        Arguments:
+            values (ndarray): Array of shape (nx, ny, nt) with the predictions at the grid nodes. The
+                x and y nodes are spaced evenly including both ends of the ranges, the time nodes are
+                at the centers of nt equal bins covering the day.
+            x_range (tuple): (x_min, x_max) in centered coordinates
+            y_range (tuple): (y_min, y_max) in centered coordinates
+        """
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.x_range = tuple(float(v) for v in x_range)
+        self.y_range = tuple(float(v) for v in y_range)
+
+        nx, ny, nt = self.values.shape
+        if nx < 2 or ny < 2:
+            raise ValueError("The cube needs at least two nodes along x and y.")
+        self.dx = (self.x_range[1] - self.x_range[0]) / (nx - 1)
+        self.dy = (self.y_range[1] - self.y_range[0]) / (ny - 1)
+        self.dt = self.MINUTES_PER_DAY / nt
+
+    @property
+    def x_nodes(self):
+        """
+        x coordinates of the grid nodes.
+        """
+        return np.linspace(self.x_range[0], self.x_range[1], self.values.shape[0])
+
+    @property
+    def y_nodes(self):
+        """
+        y coordinates of the grid nodes.
+        """
+        return np.linspace(self.y_range[0], self.y_range[1], self.values.shape[1])
+
+    @property
+    def t_nodes(self):
+        """
+        Times of day of the grid nodes in minutes since midnight.
+        """
+        return (np.arange(self.values.shape[2]) + 0.5) * self.dt
+
+    @classmethod
+    def build(cls, model, x_range, y_range, shape=(200, 200, 48), batch_size=500000):
+        """
+        Evaluates a crash model on the grid.
+
+        Arguments:
+            model: Fitted model whose predict() takes rows of (x_centered, y_centered, time_center)
+            x_range (tuple): (x_min, x_max) in centered coordinates
+            y_range (tuple): (y_min, y_max) in centered coordinates
+            shape (tuple): Number of nodes along x, y and time of day
+            batch_size (int): Number of grid nodes passed to model.predict() at once
+
+        Returns:
+            RiskCube: The cube
+        """
+        cube = cls(np.zeros(shape, dtype=np.float32), x_range, y_range)
+
+        xx, yy, tt = np.meshgrid(cube.x_nodes, cube.y_nodes, cube.t_nodes, indexing='ij')
+        X = np.column_stack([xx.ravel(), yy.ravel(), tt.ravel()])
+
+        values = cube.values.reshape(-1)
+        for start in range(0, len(X), batch_size):
+            values[start:start + batch_size] = model.predict(X[start:start + batch_size])
+
+        return cube
+
+    @classmethod
+    def from_dataset(cls, model, citibike_dataset, shape=(200, 200, 48), batch_size=500000):
+        """
+        Builds the cube over the bounds of the Citibike stations, i.e. the area crashes are
+        constrained to by BikeCrashDataset.citibike_alignment().
+
+        Arguments:
+            model: Fitted crash model
+            citibike_dataset (CitibikeDataset): Dataset providing the stations
+            shape (tuple): Number of nodes along x, y and time of day
+            batch_size (int): Number of grid nodes passed to model.predict() at once
+
+        Returns:
+            RiskCube: The cube
+        """
+        stations = citibike_dataset.stations
+        x_range = (stations['x_centered'].min(), stations['x_centered'].max())
+        y_range = (stations['y_centered'].min(), stations['y_centered'].max())
+
+        return cls.build(model, x_range, y_range, shape=shape, batch_size=batch_size)
+
+    def query(self, x, y, t, method='linear', fill_value=np.nan):
+        """
+        Interpolates the predictions at a batch of points.
+
+        Arguments:
+            x, y (array-like): Centered coordinates of the points
+            t (array-like): Time of day in minutes since midnight
+            method (str): 'linear' for trilinear or 'nearest' for nearest node interpolation
+            fill_value (float): Value of points outside of the x/y range of the cube
+
+        Returns:
+            ndarray: Interpolated predictions
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        t = np.asarray(t, dtype=np.float64)
+        x, y, t = np.broadcast_arrays(x, y, t)
+        nx, ny, nt = self.values.shape
+
+        fx = (x - self.x_range[0]) / self.dx
+        fy = (y - self.y_range[0]) / self.dy
+        ft = np.mod(t, self.MINUTES_PER_DAY) / self.dt - 0.5
+        outside = (fx < 0) | (fx > nx - 1) | (fy < 0) | (fy > ny - 1)
+
+        # Corners are gathered from the flattened cube, which is considerably faster than 3D indexing
+        v = self.values.reshape(-1)
+        stride_x, stride_y = ny * nt, nt
+
+        if method == 'nearest':
+            i = np.clip(np.rint(fx), 0, nx - 1).astype(np.intp)
+            j = np.clip(np.rint(fy), 0, ny - 1).astype(np.intp)
+            k = np.mod(np.rint(ft), nt).astype(np.intp)
+            result = v.take(i * stride_x + j * stride_y + k).astype(np.float64)
+        elif method == 'linear':
+            i0 = np.clip(np.floor(fx), 0, nx - 2).astype(np.intp)
+            j0 = np.clip(np.floor(fy), 0, ny - 2).astype(np.intp)
+            k_floor = np.floor(ft)
+            k0 = np.mod(k_floor, nt).astype(np.intp)
+            k1 = np.where(k0 == nt - 1, 0, k0 + 1)
+            wx = fx - i0
+            wy = fy - j0
+            wt = ft - k_floor
+
+            # Interpolate along time first, then along y and x
+            base = i0 * stride_x + j0 * stride_y
+            c = []
+            for offset in (0, stride_y, stride_x, stride_x + stride_y):
+                lower = v.take(base + offset + k0)
+                c.append(lower + (v.take(base + offset + k1) - lower) * wt)
+            c0 = c[0] + (c[1] - c[0]) * wy
+            c1 = c[2] + (c[3] - c[2]) * wy
+            result = c0 + (c1 - c0) * wx
+        else:
+            raise ValueError(f"Unknown interpolation method '{method}'. Use 'linear' or 'nearest'.")
+
+        return np.where(outside, fill_value, result)
+
+    def save(self, path):
+        """
+        Saves the cube and its grid metadata to a compressed .npz file.
+
+        Arguments:
+            path (str): Output path
+        """
+        np.savez_compressed(path, values=self.values, x_range=self.x_range, y_range=self.y_range)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a cube saved with save().
+
+        Arguments:
+            path (str): Path to the .npz file
+
+        Returns:
+            RiskCube: The loaded cube
+        """
+        with np.load(path) as data:
+            return cls(data['values'], data['x_range'], data['y_range'])
@@ -0,0 +1,275 @@
+import json
+import numpy as np
+
+
+class StraightLineRouter():
+    """
+    Router that connects origin and destination by a straight line. Needs no network access and
+    serves as fallback for station pairs without a known route.
+    """
+
+    def route(self, origin_xy, destination_xy, origin_ids=None, destination_ids=None):
+        """
+        Builds straight-line routes between pairs of points.
+
+        Arguments:
+            origin_xy (ndarray): Array of shape (n_routes, 2) with centered origin coordinates
+            destination_xy (ndarray): Array of shape (n_routes, 2) with centered destination coordinates
+            origin_ids (ndarray): Station ids of the origins (unused)
+            destination_ids (ndarray): Station ids of the destinations (unused)
+
+        Returns:
+            vertices (ndarray): Array of shape (n_vertices, 2) with all route vertices concatenated
+            offsets (ndarray): Array of shape (n_routes + 1,), route i spans vertices[offsets[i]:offsets[i+1]]
+        """
+        origin_xy = np.asarray(origin_xy, dtype=float)
+        destination_xy = np.asarray(destination_xy, dtype=float)
+
+        vertices = np.empty((2 * len(origin_xy), 2))
+        vertices[0::2] = origin_xy
+        vertices[1::2] = destination_xy
+        offsets = np.arange(0, 2 * len(origin_xy) + 1, 2)
+
+        return vertices, offsets
+
+
+class FileRouter():
+    """
+    Router that reads precomputed route geometries (e.g. exported from OSRM) from a local GeoJSON
+    file. Each feature has to be a LineString in EPSG:4326 with the properties 'origin' and
+    'destination' holding the Citibike station ids. Pairs without a route in the file are handled
+    by a fallback router.
+    """
+
+    def __init__(self, path, x_center, y_center, fallback=None):
+        """
+        Arguments:
+            path (str): Path to the GeoJSON file containing the route geometries
+            x_center (float): x center of the Citibike dataset used to center the routes
+            y_center (float): y center of the Citibike dataset used to center the routes
+            fallback: Router used for pairs that are missing in the file (default is StraightLineRouter)
+        """
+        self.fallback = fallback if fallback is not None else StraightLineRouter()
+        self.routes = {}
+
+        with open(path, 'r') as f:
+            features = json.load(f)['features']
+
+        import pyproj
+        transformer = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+        for feature in features:
+            coords = np.asarray(feature['geometry']['coordinates'], dtype=float)
+            x, y = transformer.transform(coords[:, 0], coords[:, 1])
+            line = np.column_stack([x - x_center, y - y_center])
+            if len(line) == 1:
+                line = np.vstack([line, line])
+
+            key = (str(feature['properties']['origin']), str(feature['properties']['destination']))
+            self.routes[key] = line
+
+    def route(self, origin_xy, destination_xy, origin_ids, destination_ids):
+        """
+        Looks up the routes of the given station pairs. See StraightLineRouter.route() for the
+        arguments and return values.
+        """
+        fallback_vertices, fallback_offsets = self.fallback.route(
+            origin_xy, destination_xy, origin_ids, destination_ids)
+
+        lines = []
+        for i, key in enumerate(zip(map(str, origin_ids), map(str, destination_ids))):
+            line = self.routes.get(key)
+            if line is None:
+                line = fallback_vertices[fallback_offsets[i]:fallback_offsets[i + 1]]
+            lines.append(line)
+
+        lengths = np.array([len(line) for line in lines], dtype=int)
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        return np.concatenate(lines), offsets
+
+
+def raster_lookup(H, xedges, yedges, x, y):
+    """
+    Looks up the raster values at the given points. Points outside of the raster get the value 0.
+
+    Arguments:
+        H (ndarray): 2D raster of shape (len(xedges) - 1, len(yedges) - 1) as returned by np.histogram2d
+        xedges, yedges (ndarray): Bin edges of the raster
+        x, y (ndarray): Coordinates of the points
+
+    Returns:
+        ndarray: Raster values at the points
+    """
+    ix = np.searchsorted(xedges, x, side='right') - 1
+    iy = np.searchsorted(yedges, y, side='right') - 1
+
+    # Points on the upper edge belong to the last bin, like in np.histogram2d
+    ix = np.where(x == xedges[-1], len(xedges) - 2, ix)
+    iy = np.where(y == yedges[-1], len(yedges) - 2, iy)
+
+    inside = (ix >= 0) & (ix < H.shape[0]) & (iy >= 0) & (iy < H.shape[1])
+    values = np.zeros(np.shape(x), dtype=float)
+    values[inside] = H[ix[inside], iy[inside]]
+
+    return values
+
+
+def integrate_routes(vertices, offsets, H, xedges, yedges, spacing=50):
+    """
+    Integrates a density raster along a batch of polylines with the midpoint rule. All routes are
+    sampled at once without a Python loop over routes or points.
+
+    Arguments:
+        vertices (ndarray): Array of shape (n_vertices, 2) with all route vertices concatenated
+        offsets (ndarray): Array of shape (n_routes + 1,) with the start index of each route
+        H (ndarray): 2D density raster (e.g. crashes per square meter)
+        xedges, yedges (ndarray): Bin edges of the raster
+        spacing (float): Maximum distance between two sample points in meters
+
+    Returns:
+        integral (ndarray): Integrated density of each route
+        length (ndarray): Length of each route in meters
+    """
+    n_routes = len(offsets) - 1
+
+    segments = np.diff(vertices, axis=0)
+    segment_lengths = np.hypot(segments[:, 0], segments[:, 1])
+    # The segments connecting the last vertex of a route with the first of the next one are ignored
+    segment_lengths[offsets[1:-1] - 1] = 0
+    cum = np.concatenate([[0], np.cumsum(segment_lengths)])
+
+    start = cum[offsets[:-1]]
+    length = cum[offsets[1:] - 1] - start
+    n_samples = np.maximum(1, np.ceil(length / spacing)).astype(int)
+    step = length / n_samples
+
+    route = np.repeat(np.arange(n_routes), n_samples)
+    k = np.arange(n_samples.sum()) - np.repeat(np.cumsum(n_samples) - n_samples, n_samples)
+    s = start[route] + (k + 0.5) * step[route]
+
+    j = np.searchsorted(cum, s, side='right') - 1
+    j = np.clip(j, offsets[route], offsets[route + 1] - 2)
+    t = np.divide(s - cum[j], segment_lengths[j], out=np.zeros_like(s), where=segment_lengths[j] > 0)
+    points = vertices[j] + t[:, None] * segments[j]
+
+    values = raster_lookup(H, xedges, yedges, points[:, 0], points[:, 1])
+    integral = np.bincount(route, weights=values * step[route], minlength=n_routes)
+
+    return integral, length
+
+
+class RouteRiskMatrix():
+    """
+    Origin x destination matrix of the crash density integrated along the route between two
+    Citibike stations. The matrix is built offline once, afterwards the route risk of a ride is a
+    constant time lookup.
+    """
+
+    def __init__(self, station_ids, risk, spacing=50):
+        """
+        Arguments:
+            station_ids (array-like): Station ids in the order of the matrix rows and columns
+            risk (ndarray): Array of shape (n_stations, n_stations) with the route risks
+            spacing (float): Sample spacing in meters that was used to build the matrix
+        """
+        self.station_ids = np.asarray(station_ids).astype(str)
+        self.risk = np.asarray(risk)
+        self.spacing = spacing
+        self.index = {station_id: i for i, station_id in enumerate(self.station_ids)}
+
+    @classmethod
+    def build(cls, stations, H, xedges, yedges, router=None, spacing=50, max_pairs=20000):
+        """
+        Builds the route risk matrix for all station pairs.
+
+        Arguments:
+            stations (DataFrame): Stations with the columns 'station_id', 'x_centered' and 'y_centered'
+            H (ndarray): 2D crash raster in centered coordinates, e.g. from DensityEstimator.histogram2d()
+            xedges, yedges (ndarray): Bin edges of the raster
+            router: Router providing the route geometries (default is StraightLineRouter)
+            spacing (float): Maximum distance between two sample points along a route in meters
+            max_pairs (int): Maximum number of routes that are integrated at once to bound memory
+
+        Returns:
+            RouteRiskMatrix: The built matrix. The risk is given in crashes per meter of bin size
+            squared times meter of route, i.e. the raster counts are converted to a density first.
+        """
+        if router is None:
+            router = StraightLineRouter()
+
+        station_ids = stations['station_id'].astype(str).values
+        xy = stations[['x_centered', 'y_centered']].values.astype(float)
+        n = len(station_ids)
+
+        cell_area = np.outer(np.diff(xedges), np.diff(yedges))
+        density = H / cell_area
+
+        risk = np.zeros((n, n), dtype=np.float32)
+        rows_per_chunk = max(1, max_pairs // max(n, 1))
+        for row_start in range(0, n, rows_per_chunk):
+            rows = np.arange(row_start, min(row_start + rows_per_chunk, n))
+            origin = np.repeat(rows, n)
+            destination = np.tile(np.arange(n), len(rows))
+
+            vertices, offsets = router.route(
+                xy[origin], xy[destination], station_ids[origin], station_ids[destination])
+            integral, _ = integrate_routes(vertices, offsets, density, xedges, yedges, spacing)
+            risk[rows] = integral.reshape(len(rows), n)
+
+        return cls(station_ids, risk, spacing)
+
+    def lookup(self, origin_id, destination_id):
+        """
+        Returns the route risk between two stations.
+
+        Arguments:
+            origin_id (str): Citibike id of the start station
+            destination_id (str): Citibike id of the end station
+
+        Returns:
+            float: Route risk
+        """
+        return float(self.risk[self.index[str(origin_id)], self.index[str(destination_id)]])
+
+    def lookup_many(self, origin_ids, destination_ids):
+        """
+        Returns the route risks of many station pairs. Unknown stations get NaN.
+
+        Arguments:
+            origin_ids (array-like): Citibike ids of the start stations
+            destination_ids (array-like): Citibike ids of the end stations
+
+        Returns:
+            ndarray: Route risks
+        """
+        rows = np.array([self.index.get(str(i), -1) for i in origin_ids], dtype=int)
+        cols = np.array([self.index.get(str(i), -1) for i in destination_ids], dtype=int)
+        known = (rows >= 0) & (cols >= 0)
+
+        result = np.full(len(rows), np.nan)
+        result[known] = self.risk[rows[known], cols[known]]
+
+        return result
+
+    def save(self, path):
+        """
+        Saves the matrix to a compressed .npz file.
+
+        Arguments:
+            path (str): Output path
+        """
+        np.savez_compressed(path, station_ids=self.station_ids, risk=self.risk, spacing=self.spacing)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a matrix saved with save().
+
+        Arguments:
+            path (str): Path to the .npz file
+
+        Returns:
+            RouteRiskMatrix: The loaded matrix
+        """
+        with np.load(path) as data:
+            return cls(data['station_ids'], data['risk'], float(data['spacing']))
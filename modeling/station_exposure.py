@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from modeling.station_locator import StationLocator
+
+
+def crash_minutes(crash_times):
+    """
+    Converts crash time strings ('H:MM') to minutes since midnight without a row-wise apply.
+
+    Arguments:
+        crash_times (Series): The 'CRASH TIME' column of a BikeCrashDataset
+
+    Returns:
+        ndarray: Minutes since midnight
+    """
+    parts = crash_times.astype(str).str.split(':', expand=True)
+    return parts[0].astype(int).values * 60 + parts[1].astype(int).values
+
+
+def station_crash_exposure(crash_dataset, citibike_dataset, radius=250, time_bin_size=60, chunk_size=100000,
+                           station_locator=None):
+    """
+    Counts for every station the bike crashes within a radius, split by time of day bin. The crash x
+    station join is done with radius queries on a KD-tree over the stations, crashes are processed 
+    in chunks so that memory stays bounded independent of the length of the crash history.
+
+    Arguments:
+        crash_dataset (BikeCrashDataset): Crash data with the columns 'x', 'y' and 'CRASH TIME'
+        citibike_dataset (CitibikeDataset): Dataset providing the stations and center values
+        radius (float): Radius around each station in meters on the ground
+        time_bin_size (int): Size of each time bin in minutes
+        chunk_size (int): Number of crashes queried at once
+        station_locator (StationLocator): Optional prebuilt locator over the stations of the dataset
+
+    Returns:
+        DataFrame: Exposure table indexed by 'station_id' with one column per time bin index 
+        (time bin i covers the minutes [i * time_bin_size, (i + 1) * time_bin_size) after midnight)
+    """
+    if station_locator is None:
+        station_locator = StationLocator.from_dataset(citibike_dataset)
+
+    n_stations = len(station_locator.station_ids)
+    n_bins = int(np.ceil(24 * 60 / time_bin_size))
+    counts = np.zeros(n_stations * n_bins, dtype=np.int64)
+
+    df = crash_dataset.df
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        xy = np.column_stack([
+            chunk['x'].values - citibike_dataset.x_center,
+            chunk['y'].values - citibike_dataset.y_center
+        ])
+        time_bins = crash_minutes(chunk['CRASH TIME']) // time_bin_size
+
+        # The radius in projected units grows with the Mercator scale factor at each crash
+        neighbors = station_locator.query_radius(xy, radius * station_locator.scale(xy))
+        n_neighbors = np.fromiter((len(n) for n in neighbors), dtype=np.int64, count=len(neighbors))
+        if n_neighbors.sum() == 0:
+            continue
+
+        station_idx = np.concatenate(neighbors)
+        flat_idx = station_idx * n_bins + np.repeat(time_bins, n_neighbors)
+        counts += np.bincount(flat_idx, minlength=n_stations * n_bins)
+
+    exposure = pd.DataFrame(
+        counts.reshape(n_stations, n_bins),
+        index=pd.Index(station_locator.station_ids, name='station_id'),
+        columns=pd.Index(np.arange(n_bins), name='time_bin')
+    )
+
+    return exposure
@@ -0,0 +1,127 @@
+import numpy as np
+
+
+# Radius of the sphere of the Web Mercator (EPSG:3857) projection in meters
+EARTH_RADIUS = 6378137.0
+
+
+class StationLocator():
+    """
+    Spatial index over the Citibike stations in projected, centered coordinates (EPSG:3857 minus
+    the dataset center). Supports batched k-nearest and radius queries in O(log n) per point.
+
+    Distances in this frame are projected units, which overstate distances on the ground by the
+    Mercator scale factor 1/cos(lat) (about 1.32 in New York), see scale().
+    """
+
+    def __init__(self, stations, x_center, y_center, leaf_size=40):
+        """
+        Arguments:
+            stations (DataFrame): Stations with the columns 'station_id', 'x_centered' and 'y_centered'
+            x_center (float): x center of the Citibike dataset
+            y_center (float): y center of the Citibike dataset
+            leaf_size (int): Leaf size of the KD-tree
+        """
+        self.station_ids = stations['station_id'].values
+        self.xy = stations[['x_centered', 'y_centered']].values.astype(float)
+        self.x_center = x_center
+        self.y_center = y_center
+        from sklearn.neighbors import KDTree
+        self.tree = KDTree(self.xy, leaf_size=leaf_size)
+        self._transformer = None
+
+    @classmethod
+    def from_dataset(cls, citibike_dataset, leaf_size=40):
+        """
+        Creates a locator over the stations of a CitibikeDataset.
+
+        Arguments:
+            citibike_dataset (CitibikeDataset): Dataset providing stations and center values
+            leaf_size (int): Leaf size of the KD-tree
+
+        Returns:
+            StationLocator: The locator
+        """
+        return cls(citibike_dataset.stations, citibike_dataset.x_center, citibike_dataset.y_center, leaf_size)
+
+    def project(self, lat, lng):
+        """
+        Transforms geographic coordinates to the centered Web Mercator frame of the stations.
+
+        Arguments:
+            lat (float or array-like): Latitudes
+            lng (float or array-like): Longitudes
+
+        Returns:
+            ndarray: Array of shape (n_points, 2) with centered x and y coordinates
+        """
+        if self._transformer is None:
+            import pyproj
+            self._transformer = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+        x, y = self._transformer.transform(np.atleast_1d(lng), np.atleast_1d(lat))
+
+        return np.column_stack([np.asarray(x) - self.x_center, np.asarray(y) - self.y_center])
+
+    def scale(self, xy):
+        """
+        Mercator scale factor at centered points, i.e. the projected units per meter on the ground.
+
+        Arguments:
+            xy (ndarray): Array of shape (n_points, 2) with centered coordinates
+
+        Returns:
+            ndarray: Scale factor 1/cos(lat) per point
+        """
+        y = np.atleast_2d(xy)[:, 1] + self.y_center
+        return np.cosh(y / EARTH_RADIUS)
+
+    def query(self, xy, k=1):
+        """
+        Finds the k nearest stations of each point.
+
+        Arguments:
+            xy (ndarray): Array of shape (n_points, 2) with centered coordinates
+            k (int): Number of neighbors
+
+        Returns:
+            distances (ndarray): Array of shape (n_points, k) with distances in projected units, sorted ascending
+            indices (ndarray): Array of shape (n_points, k) with row indices into the stations
+        """
+        k = min(k, len(self.xy))
+        return self.tree.query(np.atleast_2d(xy), k=k)
+
+    def query_radius(self, xy, radius, count_only=False):
+        """
+        Finds all stations within a radius around each point.
+
+        Arguments:
+            xy (ndarray): Array of shape (n_points, 2) with centered coordinates
+            radius (float or ndarray): Radius in projected units, or one radius per point
+            count_only (bool): If True, only the number of stations per point is returned
+
+        Returns:
+            ndarray: Number of stations per point if count_only, otherwise an object array holding
+            the station row indices per point
+        """
+        return self.tree.query_radius(np.atleast_2d(xy), r=radius, count_only=count_only)
+
+    def nearest_station_ids(self, lat, lng, max_distance=None):
+        """
+        Snaps geographic coordinates to the nearest station.
+
+        Arguments:
+            lat (float or array-like): Latitudes
+            lng (float or array-like): Longitudes
+            max_distance (float): Points farther than this many meters on the ground from any station
+                get None (default is no cutoff)
+
+        Returns:
+            ndarray: Station id of the nearest station per point
+        """
+        xy = self.project(lat, lng)
+        distances, indices = self.query(xy, k=1)
+        station_ids = self.station_ids[indices[:, 0]].astype(object)
+        if max_distance is not None:
+            station_ids[distances[:, 0] / self.scale(xy) > max_distance] = None
+
+        return station_ids
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import numpy as np
+
+
+# Half the side length of the Web Mercator (EPSG:3857) world square in meters
+WORLD_EXTENT = 20037508.342789244
+
+
+def tile_bounds(z, x, y):
+    """
+    Returns the bounds of a slippy map tile in Web Mercator coordinates.
+
+    Arguments:
+        z, x, y (int): Zoom level, column (from the west) and row (from the north) of the tile
+
+    Returns:
+        tuple: (x_min, y_min, x_max, y_max) in meters
+    """
+    size = 2 * WORLD_EXTENT / 2 ** z
+    x_min = -WORLD_EXTENT + x * size
+    y_max = WORLD_EXTENT - y * size
+    return x_min, y_max - size, x_min + size, y_max
+
+
+def tiles_covering(bounds, z):
+    """
+    Lists the tiles of a zoom level that intersect the given Web Mercator bounds.
+
+    Arguments:
+        bounds (tuple): (x_min, y_min, x_max, y_max) in meters
+        z (int): Zoom level
+
+    Returns:
+        list: (z, x, y) tuples
+    """
+    size = 2 * WORLD_EXTENT / 2 ** z
+    n = 2 ** z
+    x0 = int(np.clip((bounds[0] + WORLD_EXTENT) // size, 0, n - 1))
+    x1 = int(np.clip((bounds[2] + WORLD_EXTENT) // size, 0, n - 1))
+    y0 = int(np.clip((WORLD_EXTENT - bounds[3]) // size, 0, n - 1))
+    y1 = int(np.clip((WORLD_EXTENT - bounds[1]) // size, 0, n - 1))
+    return [(z, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def _mercator_to_lnglat(x, y):
+    """
+    Converts Web Mercator coordinates to longitude and latitude in degrees.
+    """
+    lng = np.degrees(x / WORLD_EXTENT * np.pi)
+    lat = np.degrees(2 * np.arctan(np.exp(y / WORLD_EXTENT * np.pi)) - np.pi / 2)
+    return float(lng), float(lat)
+
+
+def colorize(H, cmap='viridis', norm='log', vmin=None, vmax=None, opacity=0.8, mask_zero=True):
+    """
+    Maps a raster to RGBA colors. Values that are NaN, below vmin or (with mask_zero) exactly zero
+    become fully transparent.
+
+    Arguments:
+        H (ndarray): Raster of shape (nx, ny)
+        cmap (str): Matplotlib colormap name
+        norm (str): 'log' (e.g. for counts) or 'linear' (e.g. for ratios and densities)
+        vmin, vmax (float): Value range of the colormap, by default the smallest visible (for 'log'
+            the smallest positive) and the largest value
+        opacity (float): Opacity of the visible pixels between 0 and 1
+        mask_zero (bool): If True, cells with value 0 are transparent
+
+    Returns:
+        tuple: (rgba, vmin, vmax) where rgba is a uint8 array of shape (nx, ny, 4)
+    """
+    import matplotlib
+
+    H = np.asarray(H, dtype=float)
+    visible = np.isfinite(H)
+    if mask_zero:
+        visible &= H != 0
+    if norm == 'log':
+        visible &= H > 0
+    elif norm != 'linear':
+        raise ValueError(f"Unknown norm '{norm}'. Use 'log' or 'linear'.")
+
+    values = H[visible]
+    if vmin is None:
+        vmin = float(values.min()) if len(values) else 0.0
+    if vmax is None:
+        vmax = float(values.max()) if len(values) else 1.0
+    visible &= H >= vmin
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if norm == 'log':
+            scaled = np.log(H / vmin) / np.log(vmax / vmin) if vmax > vmin else np.ones_like(H)
+        else:
+            scaled = (H - vmin) / (vmax - vmin) if vmax > vmin else np.ones_like(H)
+    index = np.clip(np.nan_to_num(scaled, nan=0, posinf=1, neginf=0) * 255, 0, 255).astype(np.uint8)
+
+    lut = matplotlib.colormaps[cmap](np.linspace(0, 1, 256), bytes=True)
+    rgba = lut[index]
+    rgba[..., 3] = np.where(visible, int(round(opacity * 255)), 0)
+
+    return rgba, vmin, vmax
+
+
+def _render_tiles(rgba, bounds, tiles, output_dir, tile_size):
+    """
+    Renders a batch of tiles by nearest neighbor sampling of the colored raster and writes the
+    non-empty ones as PNG files.
+
+    Returns:
+        int: Number of written tiles
+    """
+    from PIL import Image
+
+    nx, ny = rgba.shape[:2]
+    dx = (bounds[2] - bounds[0]) / nx
+    dy = (bounds[3] - bounds[1]) / ny
+    pixel = (np.arange(tile_size) + 0.5) / tile_size
+
+    n_written = 0
+    for z, x, y in tiles:
+        t_x_min, t_y_min, t_x_max, t_y_max = tile_bounds(z, x, y)
+        # Pixel centers, rows run from north to south
+        px = t_x_min + pixel * (t_x_max - t_x_min)
+        py = t_y_max - pixel * (t_y_max - t_y_min)
+        ix = np.floor((px - bounds[0]) / dx).astype(np.intp)
+        iy = np.floor((py - bounds[1]) / dy).astype(np.intp)
+        inside_x = (ix >= 0) & (ix < nx)
+        inside_y = (iy >= 0) & (iy < ny)
+
+        tile = rgba[np.clip(ix, 0, nx - 1)[None, :], np.clip(iy, 0, ny - 1)[:, None]]
+        tile[~(inside_y[:, None] & inside_x[None, :]), 3] = 0
+        if not tile[..., 3].any():
+            continue
+
+        tile_dir = os.path.join(output_dir, str(z), str(x))
+        os.makedirs(tile_dir, exist_ok=True)
+        # PNG encoding dominates the export, the fastest zlib level trades a little file size for speed
+        Image.fromarray(tile, 'RGBA').save(os.path.join(tile_dir, f'{y}.png'), compress_level=1)
+        n_written += 1
+
+    return n_written
+
+
+def export_tile_pyramid(H, extent, output_dir, x_center=0.0, y_center=0.0, zoom_levels=range(10, 17),
+                        tile_size=256, cmap='viridis', norm='log', vmin=None, vmax=None, opacity=0.8,
+                        mask_zero=True, n_jobs=-1, batch_size=256):
+    """
+    Renders a raster as a z/x/y PNG tile pyramid for slippy maps (e.g. Leaflet or MapLibre), without
+    a display. Tiles without any visible pixel are not written, so the map shows its base layer
+    there. A metadata.json with the bounds, zoom levels and color scale is written alongside.
+
+    Arguments:
+        H (ndarray): Raster of shape (nx, ny) in the layout of DensityEstimator.histogram2d() and
+            histogram2d_ratio(), pass the transposed density for DensityEstimator.evaluate_grid()
+        extent (list or tuple): The [x_min, x_max, y_min, y_max] boundaries of the raster in
+            centered coordinates, as for DensityEstimator.plot_heatmap()
+        output_dir (str): Directory the tiles are written to
+        x_center, y_center (float): Center of the Citibike dataset the coordinates are relative to
+        zoom_levels (iterable): Zoom levels to render
+        tile_size (int): Tile width and height in pixels
+        cmap, norm, vmin, vmax, opacity, mask_zero: Color scale, see colorize()
+        n_jobs (int): Number of parallel jobs, -1 uses all cores
+        batch_size (int): Number of tiles rendered per job
+
+    Returns:
+        dict: Number of written and skipped tiles and the seconds spent
+    """
+    start = time.perf_counter()
+    rgba, vmin, vmax = colorize(H, cmap=cmap, norm=norm, vmin=vmin, vmax=vmax, opacity=opacity, mask_zero=mask_zero)
+    bounds = (extent[0] + x_center, extent[2] + y_center, extent[1] + x_center, extent[3] + y_center)
+
+    zoom_levels = list(zoom_levels)
+    tiles = [tile for z in zoom_levels for tile in tiles_covering(bounds, z)]
+    batches = [tiles[i:i + batch_size] for i in range(0, len(tiles), batch_size)]
+
+    if n_jobs == 1:
+        written = [_render_tiles(rgba, bounds, batch, output_dir, tile_size) for batch in batches]
+    else:
+        from joblib import Parallel, delayed
+        written = Parallel(n_jobs=n_jobs)(
+            delayed(_render_tiles)(rgba, bounds, batch, output_dir, tile_size) for batch in batches)
+
+    n_written = int(sum(written))
+    west, south = _mercator_to_lnglat(bounds[0], bounds[1])
+    east, north = _mercator_to_lnglat(bounds[2], bounds[3])
+    metadata = {
+        'bounds': [west, south, east, north],
+        'minzoom': min(zoom_levels),
+        'maxzoom': max(zoom_levels),
+        'tile_size': tile_size,
+        'cmap': cmap,
+        'norm': norm,
+        'vmin': vmin,
+        'vmax': vmax,
+        'tiles': n_written,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    return {'written': n_written, 'skipped': len(tiles) - n_written, 'seconds': time.perf_counter() - start}
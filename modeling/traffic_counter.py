@@ -0,0 +1,260 @@
+import json
+import time
+import queue
+import threading
+import numpy as np
+import pandas as pd
+
+
+class CountMinSketch():
+    """
+    Count-min sketch for approximate counts with fixed memory. Counts are never underestimated and
+    overestimated by at most e / width times the total count with probability 1 - exp(-depth).
+    Sketches of the same shape can be added and subtracted, which is used to expire buckets.
+    """
+
+    def __init__(self, width=2048, depth=4):
+        """
+        Arguments:
+            width (int): Number of counters per row
+            depth (int): Number of rows (independent hash functions)
+        """
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key):
+        """
+        Returns the counter column of the key in each row.
+        """
+        return np.array([hash((row, key)) % self.width for row in range(self.depth)])
+
+    def add(self, key, count=1):
+        """
+        Adds count (may be negative) to the counters of the key.
+        """
+        self.table[self._rows, self._columns(key)] += count
+
+    def count(self, key):
+        """
+        Returns the estimated count of the key.
+        """
+        return int(self.table[self._rows, self._columns(key)].min())
+
+
+class SlidingWindowTrafficCounter():
+    """
+    Maintains station x time-of-day bin traffic counts (ride starts plus ride ends) over a sliding
+    time window. The window is split into buckets, each event updates its bucket and the running
+    totals in O(1), and a bucket's counts are subtracted from the totals once it leaves the window.
+    Memory is bounded by the number of buckets times the number of station x bin keys, or by the
+    fixed sketch size when approximate counting is enabled.
+    """
+
+    def __init__(self, window='28D', bucket_size='1D', time_bin_size=30, sketch_width=None, sketch_depth=4):
+        """
+        Arguments:
+            window (str or Timedelta): Length of the sliding window
+            bucket_size (str or Timedelta): Granularity with which events leave the window
+            time_bin_size (int): Size of the time of day bins in minutes, should match PriceCalculator
+            sketch_width (int): If given, counts are kept in count-min sketches of this width instead of exactly
+            sketch_depth (int): Depth of the count-min sketches
+        """
+        self.window = pd.Timedelta(window)
+        self.bucket_size = pd.Timedelta(bucket_size)
+        self.time_bin_size = time_bin_size
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+
+        self.n_buckets = int(np.ceil(self.window / self.bucket_size))
+        self.buckets = {}  # bucket index -> counts of the events in that bucket
+        self.totals = self._new_counts()
+        self.latest_bucket = None
+        self.n_events = 0
+        self.n_dropped = 0
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _new_counts(self):
+        """
+        Creates an empty counts container (dict or sketch).
+        """
+        if self.sketch_width is not None:
+            return CountMinSketch(self.sketch_width, self.sketch_depth)
+        return {}
+
+    def _add_counts(self, counts, key, value):
+        """
+        Adds value to the count of key, exact counts that drop to 0 are removed.
+        """
+        if self.sketch_width is not None:
+            counts.add(key, value)
+        else:
+            new_value = counts.get(key, 0) + value
+            if new_value:
+                counts[key] = new_value
+            else:
+                del counts[key]
+
+    def _expire(self):
+        """
+        Removes all buckets that are no longer in the window and subtracts them from the totals.
+        Only runs when a new bucket starts, so its cost is amortized over the events of a bucket.
+        """
+        for bucket in [b for b in self.buckets if b <= self.latest_bucket - self.n_buckets]:
+            counts = self.buckets.pop(bucket)
+            if self.sketch_width is not None:
+                self.totals.table -= counts.table
+            else:
+                for key, value in counts.items():
+                    self._add_counts(self.totals, key, -value)
+
+    def add(self, station_id, timestamp, count=1):
+        """
+        Counts a ride start or end at a station.
+
+        Arguments:
+            station_id (str): Citibike id of the station
+            timestamp (datetime): Time of the event
+            count (int): Number of events
+        """
+        timestamp = pd.Timestamp(timestamp)
+        bucket = (timestamp - pd.Timestamp(0)) // self.bucket_size
+        key = (str(station_id), (timestamp.hour * 60 + timestamp.minute) // self.time_bin_size)
+
+        with self._lock:
+            if self.latest_bucket is None or bucket > self.latest_bucket:
+                self.latest_bucket = bucket
+                self._expire()
+            elif bucket <= self.latest_bucket - self.n_buckets:
+                # Event is older than the window
+                self.n_dropped += count
+                return
+
+            counts = self.buckets.get(bucket)
+            if counts is None:
+                counts = self.buckets[bucket] = self._new_counts()
+
+            self._add_counts(counts, key, count)
+            self._add_counts(self.totals, key, count)
+            self.n_events += count
+
+    def add_event(self, event):
+        """
+        Counts a ride event given as dict with the keys 'station_id' and 'timestamp' (and e.g.
+        'event': 'start' or 'end', both count as traffic).
+
+        Arguments:
+            event (dict): The ride event
+        """
+        self.add(event['station_id'], event['timestamp'])
+
+    def consume(self, events):
+        """
+        Counts all events of an iterable.
+
+        Arguments:
+            events (iterable): Ride events, see add_event()
+        """
+        for event in events:
+            self.add_event(event)
+
+    def count(self, station_id, bin_index):
+        """
+        Returns the traffic of a station in a time of day bin within the current window.
+
+        Arguments:
+            station_id (str): Citibike id of the station
+            bin_index (int): Index of the time bin (minutes since midnight // time_bin_size)
+
+        Returns:
+            int: Number of ride starts plus ride ends
+        """
+        key = (str(station_id), int(bin_index))
+        with self._lock:
+            if self.sketch_width is not None:
+                return self.totals.count(key)
+            return self.totals.get(key, 0)
+
+    def start(self, events):
+        """
+        Consumes an event source in a background thread, e.g. follow_file() or iter_queue().
+
+        Arguments:
+            events (iterable): Ride events, see add_event()
+        """
+        def run():
+            for event in events:
+                if self._stop.is_set():
+                    break
+                self.add_event(event)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stops the background thread started with start() after its current event.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def follow_file(path, poll_interval=1.0, stop_event=None, from_start=True):
+    """
+    Yields ride events from a JSON lines file and keeps following it as new lines are appended,
+    like 'tail -f'. Each line has to hold one event, e.g.
+    {"event": "start", "station_id": "5788.13", "timestamp": "2023-12-01T08:05:00"}.
+
+    Arguments:
+        path (str): Path to the JSON lines file
+        poll_interval (float): Seconds to wait for new lines
+        stop_event (threading.Event): Stops following once set, otherwise the generator runs forever
+        from_start (bool): If False, only lines appended after opening the file are read
+
+    Yields:
+        dict: Ride events
+    """
+    with open(path, 'r') as f:
+        if not from_start:
+            f.seek(0, 2)
+        buffer = ''
+        while stop_event is None or not stop_event.is_set():
+            line = f.readline()
+            if not line:
+                time.sleep(poll_interval)
+                continue
+            buffer += line
+            # A line without newline is still being written
+            if not buffer.endswith('\n'):
+                continue
+            if buffer.strip():
+                yield json.loads(buffer)
+            buffer = ''
+
+
+def iter_queue(event_queue, sentinel=None, timeout=None):
+    """
+    Yields ride events from an in-process queue until the sentinel is received.
+
+    Arguments:
+        event_queue (queue.Queue): Queue the events are put into
+        sentinel: Object that ends the iteration
+        timeout (float): Stop if no event arrives within this many seconds (default is to wait forever)
+
+    Yields:
+        dict: Ride events
+    """
+    while True:
+        try:
+            event = event_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        if event is sentinel:
+            return
+        yield event
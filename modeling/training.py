@@ -0,0 +1,277 @@
+"""
+Reproducible training pipeline for crash models, usable as module and from the command line:
+
+    python -m modeling.training --crashes data/bike_crashes.csv --rides data/2023-citibike-tripdata
+
+The crash raster is cached, all model/hyperparameter candidates and cross-validation folds are
+evaluated in one parallel pool, and the best model is written to fitted_models/ together with a
+JSON file holding its parameters, metrics and timings.
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import numpy as np
+
+from modeling.fingerprint import file_fingerprint
+
+
+def default_search_space():
+    """
+    Returns the models and hyperparameter grids that were compared in crash_model_fitting.ipynb.
+
+    Returns:
+        list: One dict per model with the keys 'name', 'estimator' and 'param_grid'
+    """
+    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+    from sklearn.svm import SVR
+
+    return [
+        {
+            'name': 'Random Forest',
+            'estimator': RandomForestRegressor(random_state=42),
+            'param_grid': {
+                'n_estimators': [50, 100, 150],
+                'max_depth': [None, 5, 10, 15]
+            }
+        },
+        {
+            'name': 'Gradient Boosting',
+            'estimator': GradientBoostingRegressor(random_state=42),
+            'param_grid': {
+                'n_estimators': [100, 200, 300],
+                'learning_rate': [0.1, 0.05, 0.01],
+                'max_depth': [3, 5, 7]
+            }
+        },
+        {
+            'name': 'SVR',
+            'estimator': SVR(),
+            'param_grid': {
+                'C': [0.1, 1, 10, 100],
+                'epsilon': [0.01, 0.1, 1],
+                'gamma': ['scale', 'auto']
+            }
+        }
+    ]
+
+
+def build_raster(crash_path, citibike_path, bins=80, time_bin_size=60, cache_dir=None):
+    """
+    Builds the spatio-temporal crash raster used as training data. The raster is cached under a key
+    derived from the input files and raster parameters, so repeated runs skip loading the datasets.
+
+    Arguments:
+        crash_path (str): Path to the NYPD crash CSV (raw or preprocessed)
+        citibike_path (str): Path to the Citibike trip data (see CitibikeDataset)
+        bins (int): Number of spatial bins along each axis
+        time_bin_size (int): Size of each temporal bin in minutes
+        cache_dir (str): Directory for cached rasters, None disables caching
+
+    Returns:
+        X (ndarray): Array of shape (n_cells, 3) with x center, y center and time center
+        y (ndarray): Crash counts per cell
+    """
+    cache_path = None
+    if cache_dir is not None:
+        key = json.dumps([file_fingerprint(crash_path), file_fingerprint(citibike_path), bins, time_bin_size])
+        cache_path = os.path.join(cache_dir, f'raster_{hashlib.sha256(key.encode()).hexdigest()[:16]}.npz')
+        if os.path.exists(cache_path):
+            with np.load(cache_path) as data:
+                return data['X'], data['y']
+
+    from datasets.bike_crash_dataset import BikeCrashDataset
+    from datasets.citibike_dataset import CitibikeDataset
+
+    crash_dataset = BikeCrashDataset(crash_path)
+    citibike_dataset = CitibikeDataset(citibike_path)
+    crash_dataset.citibike_alignment(citibike_dataset)
+
+    df_raster = crash_dataset.get_spatio_temporal_rasterization(bins=bins, time_bin_size=time_bin_size)
+    X = df_raster[['x_center', 'y_center', 'time_center']].values
+    y = df_raster['crash_count'].values
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(cache_path, X=X, y=y)
+
+    return X, y
+
+
+def _evaluate_candidate_fold(estimator, params, X, y, train_idx, test_idx):
+    """
+    Fits one candidate on one cross-validation fold.
+
+    Returns:
+        float: Mean squared error on the held-out fold
+    """
+    from sklearn.base import clone
+    from sklearn.metrics import mean_squared_error
+
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train_idx], y[train_idx])
+    return mean_squared_error(y[test_idx], model.predict(X[test_idx]))
+
+
+def search_models(X, y, search_space=None, budget=None, cv=3, n_jobs=-1, random_state=42):
+    """
+    Evaluates all model/hyperparameter candidates with k-fold cross-validation. Unlike one
+    GridSearchCV per model, all (candidate, fold) fits of all models share one parallel pool.
+
+    Arguments:
+        X (ndarray): Training features
+        y (ndarray): Training targets
+        search_space (list): Models and parameter grids (default is default_search_space())
+        budget (int): Maximum number of candidates, a random subset is evaluated if there are more
+        cv (int): Number of cross-validation folds
+        n_jobs (int): Number of parallel jobs, -1 uses all cores
+        random_state (int): Seed for the candidate subset and the folds
+
+    Returns:
+        list: One dict per candidate with the keys 'name', 'estimator', 'params' and 'mse', sorted
+        by ascending cross-validation MSE
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import KFold, ParameterGrid
+
+    if search_space is None:
+        search_space = default_search_space()
+
+    candidates = [
+        {'name': model['name'], 'estimator': model['estimator'], 'params': params}
+        for model in search_space
+        for params in ParameterGrid(model['param_grid'])
+    ]
+    if budget is not None and budget < len(candidates):
+        rng = np.random.default_rng(random_state)
+        selected = np.sort(rng.choice(len(candidates), size=budget, replace=False))
+        candidates = [candidates[i] for i in selected]
+
+    folds = list(KFold(n_splits=cv, shuffle=True, random_state=random_state).split(X))
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_evaluate_candidate_fold)(c['estimator'], c['params'], X, y, train_idx, test_idx)
+        for c in candidates
+        for train_idx, test_idx in folds
+    )
+
+    scores = np.asarray(scores).reshape(len(candidates), cv)
+    for candidate, candidate_scores in zip(candidates, scores):
+        candidate['mse'] = float(candidate_scores.mean())
+
+    return sorted(candidates, key=lambda c: c['mse'])
+
+
+def train(crash_path, citibike_path, output_dir='fitted_models', model_name='crash_model', bins=80,
+          time_bin_size=60, search_space=None, budget=None, cv=3, n_jobs=-1, test_size=0.2,
+          random_state=42, cache_dir=None):
+    """
+    Runs the full training pipeline and writes the best model and its metadata to output_dir.
+
+    Arguments:
+        crash_path (str): Path to the NYPD crash CSV
+        citibike_path (str): Path to the Citibike trip data
+        output_dir (str): Directory the model is written to
+        model_name (str): File name of the model without extension
+        bins (int): Number of spatial raster bins along each axis
+        time_bin_size (int): Size of each temporal raster bin in minutes
+        search_space (list): Models and parameter grids (default is default_search_space())
+        budget (int): Maximum number of evaluated candidates
+        cv (int): Number of cross-validation folds
+        n_jobs (int): Number of parallel jobs, -1 uses all cores
+        test_size (float): Fraction of the raster cells held out for the final evaluation
+        random_state (int): Seed for the train/test split, candidate subset and folds
+        cache_dir (str): Directory for cached rasters (default is <output_dir>/cache, ignored by git)
+
+    Returns:
+        dict: The metadata that was written next to the model
+    """
+    from sklearn.base import clone
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    if cache_dir is None:
+        cache_dir = os.path.join(output_dir, 'cache')
+    timings = {}
+
+    start = time.perf_counter()
+    X, y = build_raster(crash_path, citibike_path, bins=bins, time_bin_size=time_bin_size, cache_dir=cache_dir)
+    timings['raster'] = time.perf_counter() - start
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+    start = time.perf_counter()
+    candidates = search_models(X_train, y_train, search_space, budget=budget, cv=cv, n_jobs=n_jobs,
+                               random_state=random_state)
+    timings['search'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    best = candidates[0]
+    model = clone(best['estimator']).set_params(**best['params'])
+    model.fit(X_train, y_train)
+    timings['refit'] = time.perf_counter() - start
+
+    y_pred = model.predict(X_test)
+    metadata = {
+        'model': best['name'],
+        'params': best['params'],
+        'cv_mse': best['mse'],
+        'test_metrics': {
+            'mae': float(mean_absolute_error(y_test, y_pred)),
+            'mse': float(mean_squared_error(y_test, y_pred)),
+            'r2': float(r2_score(y_test, y_pred)),
+        },
+        'n_candidates': len(candidates),
+        'n_train': int(len(X_train)),
+        'n_test': int(len(X_test)),
+        'raster': {'bins': bins, 'time_bin_size': time_bin_size},
+        'random_state': random_state,
+        'timings': timings,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+    # Write to temporary files first so that readers never see a partially written model
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, f'{model_name}.pkl')
+    metadata_path = os.path.join(output_dir, f'{model_name}.json')
+    with open(model_path + '.tmp', 'wb') as f:
+        pickle.dump(model, f)
+    with open(metadata_path + '.tmp', 'w') as f:
+        json.dump(metadata, f, indent=2, default=str)
+    os.replace(metadata_path + '.tmp', metadata_path)
+    os.replace(model_path + '.tmp', model_path)
+
+    return metadata
+
+
+def main(argv=None):
+    """
+    Command-line entry point, see 'python -m modeling.training --help'.
+    """
+    parser = argparse.ArgumentParser(description='Train a crash model and write it to fitted_models/.')
+    parser.add_argument('--crashes', required=True, help='Path to the NYPD crash CSV')
+    parser.add_argument('--rides', required=True, help='Path to the Citibike trip data (CSV or directory)')
+    parser.add_argument('--output-dir', default='fitted_models', help='Output directory of the model')
+    parser.add_argument('--model-name', default='crash_model', help='File name of the model without extension')
+    parser.add_argument('--bins', type=int, default=80, help='Spatial raster bins per axis')
+    parser.add_argument('--time-bin-size', type=int, default=60, help='Temporal raster bin size in minutes')
+    parser.add_argument('--budget', type=int, default=None, help='Maximum number of evaluated candidates')
+    parser.add_argument('--cv', type=int, default=3, help='Number of cross-validation folds')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Parallel jobs, -1 uses all cores')
+    parser.add_argument('--random-state', type=int, default=42, help='Random seed')
+    parser.add_argument('--cache-dir', default=None, help='Raster cache directory (default <output-dir>/cache)')
+    args = parser.parse_args(argv)
+
+    metadata = train(
+        args.crashes, args.rides, output_dir=args.output_dir, model_name=args.model_name, bins=args.bins,
+        time_bin_size=args.time_bin_size, budget=args.budget, cv=args.cv, n_jobs=args.n_jobs,
+        random_state=args.random_state, cache_dir=args.cache_dir
+    )
+    json.dump(metadata, sys.stdout, indent=2, default=str)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -111,5 +111,18 @@ class TestCitibikeDataset(unittest.TestCase):
             self.assertAlmostEqual(row['x_centered'], row['x'] - dataset.x_center, delta=1, msg=f"x_centered incorrect for station {row['station_id']}.")
             self.assertAlmostEqual(row['y_centered'], row['y'] - dataset.y_center, delta=1, msg=f"y_centered incorrect for station {row['station_id']}.")
 
+    def test_dataframe_and_stations_only(self):
+        # Test that a loaded DataFrame gives the same dataset as the CSV file, and that a stations-only
+        # dataset keeps the stations and center without rides.
+        dataset = CitibikeDataset(self.temp_file.name)
+        from_df = CitibikeDataset(pd.read_csv(self.temp_file.name))
+        pd.testing.assert_frame_equal(from_df.stations, dataset.stations)
+        self.assertEqual(len(from_df.df_rides), len(dataset.df_rides))
+
+        stations_only = CitibikeDataset.from_stations(dataset.stations, dataset.x_center, dataset.y_center)
+        self.assertIsNone(stations_only.df_rides)
+        self.assertEqual(stations_only.x_center, dataset.x_center)
+        self.assertIs(stations_only.stations, dataset.stations)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from datasets.ride_store import RideStore
+from datasets.citibike_dataset import CitibikeDataset
+
+
+class TestRideStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store_path = os.path.join(self.temp_dir.name, 'store')
+        # Three rides per day on three days, one of them per day in Brooklyn.
+        started_at = pd.date_range('2023-12-01 06:00', periods=9, freq='8h')
+        self.df = pd.DataFrame({
+            'ride_id': [str(i) for i in range(9)],
+            'rideable_type': ['classic_bike'] * 9,
+            'started_at': started_at,
+            'ended_at': started_at + pd.Timedelta(minutes=15),
+            'start_station_name': ['Station A', 'Station B', 'Station C'] * 3,
+            'start_station_id': ['A1', 'B1', 'C1'] * 3,
+            'end_station_name': ['Station B', 'Station C', 'Station A'] * 3,
+            'end_station_id': ['B1', 'C1', 'A1'] * 3,
+            'start_lat': [40.75, 40.76, 40.68] * 3,
+            'start_lng': [-73.99, -73.98, -73.95] * 3,
+            'end_lat': [40.76, 40.68, 40.75] * 3,
+            'end_lng': [-73.98, -73.95, -73.99] * 3,
+            'member_casual': ['member'] * 9
+        })
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write_partitions(self):
+        RideStore(self.store_path).write(self.df, tile_size=0.05, row_group_size=1)
+        files = RideStore(self.store_path)._read_manifest()
+        self.assertEqual(sum(f['n_rows'] for f in files), 9)
+        self.assertTrue(all(f['path'].startswith('date=2023-12-0') for f in files))
+        self.assertEqual(len({os.path.dirname(f['path']) for f in files}), len(files))
+
+    def test_load_with_predicates(self):
+        store = RideStore(self.store_path)
+        store.write(self.df, tile_size=0.05, row_group_size=1)
+
+        self.assertEqual(len(store.load()), 9)
+        df_day = store.load(start='2023-12-02', end='2023-12-03')
+        self.assertTrue((df_day['started_at'].dt.day == 2).all())
+        self.assertEqual(len(df_day), 3)
+
+        manhattan = (-74.02, 40.70, -73.97, 40.80)
+        df_bbox = store.load(start='2023-12-02', bbox=manhattan, columns=['ride_id'])
+        self.assertEqual(list(df_bbox.columns), ['ride_id'])
+        self.assertEqual(len(df_bbox), 4)
+
+    def test_pruning_skips_other_partitions(self):
+        store = RideStore(self.store_path)
+        store.write(self.df, row_group_size=1)
+
+        # Files of partitions outside of the queried range are never opened.
+        for entry in store._read_manifest():
+            if not entry['path'].startswith('date=2023-12-03'):
+                os.remove(os.path.join(self.store_path, entry['path']))
+        self.assertEqual(len(store.load(start='2023-12-03')), 3)
+
+    def test_citibike_dataset_roundtrip(self):
+        csv_path = os.path.join(self.temp_dir.name, 'rides.csv')
+        self.df.to_csv(csv_path, index=False)
+        CitibikeDataset(csv_path).to_store(self.store_path)
+
+        dataset = CitibikeDataset.from_store(self.store_path, start='2023-12-01', end='2023-12-02')
+        self.assertEqual(len(dataset.df_rides), 3)
+        self.assertIn('ride_duration', dataset.df_rides.columns)
+        self.assertEqual(len(dataset.stations), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+import pyproj
+from datasets.service_area import ServiceArea
+from datasets.bike_crash_dataset import BikeCrashDataset
+
+
+class TestServiceArea(unittest.TestCase):
+
+    def setUp(self):
+        # L-shaped station layout, the upper right part of its bounding box has no stations.
+        xy = np.array([[x, y] for x in range(0, 2001, 250) for y in range(0, 2001, 250) if x <= 500 or y <= 500])
+        self.stations = pd.DataFrame({
+            'station_id': [str(i) for i in range(len(xy))],
+            'x_centered': xy[:, 0].astype(float),
+            'y_centered': xy[:, 1].astype(float)
+        })
+
+    def test_from_stations(self):
+        convex = ServiceArea.from_stations(self.stations, buffer=100)
+        np.testing.assert_array_equal(convex.contains([500, 1900, 1900, -50], [500, 1900, 50, -50]),
+                                      [True, False, True, True])
+
+        concave = ServiceArea.from_stations(self.stations, buffer=100, hull='concave', concave_ratio=0.1)
+        self.assertFalse(concave.contains(1100, 1100))
+        self.assertTrue(convex.contains(1100, 1100))
+        self.assertTrue(concave.contains(1900, 50))
+
+        with self.assertRaises(ValueError):
+            ServiceArea.from_stations(self.stations, hull='circle')
+
+    def test_masks(self):
+        area = ServiceArea.from_stations(self.stations, buffer=0)
+        edges = np.linspace(0, 2000, 5)
+        mask = area.cell_mask(edges, edges)
+        self.assertEqual(mask.shape, (4, 4))
+        self.assertTrue(mask[0, 0])
+        self.assertFalse(mask[3, 3])
+        self.assertIs(area.cell_mask(edges, edges), mask)
+
+        grid = np.linspace(0, 2000, 3)
+        np.testing.assert_array_equal(area.grid_mask(grid, grid), [[True, True, True], [True, True, False], [True, False, False]])
+
+    def test_from_geojson(self):
+        x_center, y_center = -8235000.0, 4975000.0
+        transformer = pyproj.Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+        lng, lat = transformer.transform(np.array([0, 100, 100, 0, 0]) + x_center, np.array([0, 0, 100, 100, 0]) + y_center)
+        geojson = {'type': 'FeatureCollection', 'features': [{
+            'type': 'Feature', 'properties': {},
+            'geometry': {'type': 'Polygon', 'coordinates': [list(map(list, zip(lng, lat)))]}
+        }]}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'area.geojson')
+            with open(path, 'w') as f:
+                json.dump(geojson, f)
+            area = ServiceArea.from_geojson(path, x_center, y_center)
+
+        np.testing.assert_array_equal(area.contains([50, 150], [50, 50]), [True, False])
+
+    def test_citibike_alignment(self):
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
+        temp_file.close()
+        pd.DataFrame({
+            'CRASH DATE': ['2023-01-01'] * 3,
+            'CRASH TIME': ['10:00'] * 3,
+            'LATITUDE': [40.7] * 3,
+            'LONGITUDE': [-74.0] * 3,
+            'CRASH_DATETIME': ['2023-01-01 10:00'] * 3,
+            'x': [100.0, 1900.0, 1900.0],
+            'y': [100.0, 1900.0, 50.0]
+        }).to_csv(temp_file.name, index=False)
+        dataset = BikeCrashDataset(temp_file.name)
+        os.unlink(temp_file.name)
+
+        class DummyCitibike:
+            pass
+        dummy = DummyCitibike()
+        dummy.x_center = 0
+        dummy.y_center = 0
+        dummy.stations = self.stations
+
+        dataset.citibike_alignment(dummy, service_area=ServiceArea.from_stations(self.stations, buffer=100))
+        self.assertEqual(list(dataset.df['y']), [100.0, 50.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from datasets.citibike_dataset import CitibikeDataset
+
+
+# Dummy model that predicts a fixed crash count for every row.
+class ConstantModel:
+    def __init__(self, value=2.0):
+        self.value = value
+
+    def predict(self, X):
+        return np.full(len(X), self.value)
+
+
+def citibike_dataset(station_ids, x_centered, y_centered, x_center=0.0, y_center=0.0, **columns):
+    """
+    Creates a CitibikeDataset with the given stations and one ride from the first station to itself
+    at 8:05 - 8:10, i.e. a traffic of one ride in the morning bin of the first station.
+
+    Arguments:
+        station_ids (list): Station ids
+        x_centered, y_centered (list): Centered station coordinates
+        x_center, y_center (float): Center of the coordinates
+        **columns: Further station columns, e.g. lat and lng
+
+    Returns:
+        CitibikeDataset: The dataset
+    """
+    stations = pd.DataFrame({'station_id': station_ids, **columns, 'x_centered': x_centered, 'y_centered': y_centered})
+    dataset = CitibikeDataset.from_stations(stations, x_center, y_center)
+    dataset.df_rides = pd.DataFrame({
+        'start_station_id': [station_ids[0]],
+        'started_at': [datetime(2023, 3, 1, 8, 5)],
+        'end_station_id': [station_ids[0]],
+        'ended_at': [datetime(2023, 3, 1, 8, 10)]
+    })
+
+    return dataset
@@ -0,0 +1,71 @@
+import unittest
+import os
+import io
+import pickle
+import zipfile
+import tempfile
+import numpy as np
+import pandas as pd
+from modeling.price_calculator import PriceCalculator
+from modeling.batch_pricing import iter_trip_chunks, price_trips, _lightweight_calculator
+from pricing_fixtures import ConstantModel, citibike_dataset
+
+
+class TestBatchPricing(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        model_path = os.path.join(self.temp_dir.name, 'model.pkl')
+        with open(model_path, 'wb') as f:
+            pickle.dump(ConstantModel(2.0), f)
+        self.calculator = PriceCalculator(model_path, citibike_dataset(['A1'], [100.0], [200.0]))
+
+        # 10 trips, every second one in the 8:00 bin at A1, one at an unknown station.
+        self.trips = pd.DataFrame({
+            'ride_id': [f'r{i}' for i in range(10)],
+            'rideable_type': ['classic_bike'] * 10,
+            'started_at': ['2023-03-02 08:15:00', '2023-03-02 12:00:00'] * 5,
+            'start_station_id': ['A1'] * 9 + ['X1'],
+        })
+        self.trips_dir = os.path.join(self.temp_dir.name, 'trips')
+        os.makedirs(self.trips_dir)
+        self.trips.iloc[:4].to_csv(os.path.join(self.trips_dir, 'part_1.csv'), index=False)
+        with zipfile.ZipFile(os.path.join(self.trips_dir, 'part_2.zip'), 'w') as z:
+            z.writestr('part_2.csv', self.trips.iloc[4:].to_csv(index=False))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_iter_trip_chunks(self):
+        chunks = list(iter_trip_chunks(self.trips_dir, chunksize=3))
+        self.assertEqual([len(c) for c in chunks], [3, 1, 3, 3])
+        self.assertEqual(list(chunks[0].columns), ['ride_id', 'started_at', 'start_station_id'])
+
+    def check_output(self, df):
+        self.assertEqual(list(df['ride_id']), list(self.trips['ride_id']))
+        np.testing.assert_allclose(df['risk_per_ride'].values[:9], [1.0, 2.0] * 4 + [1.0])
+        self.assertTrue(np.isnan(df['risk_per_ride'].values[9]))
+        np.testing.assert_allclose(df['insurance_price'].values[:2], [5.0, 10.0])
+
+    def test_price_trips_csv(self):
+        output_path = os.path.join(self.temp_dir.name, 'prices.csv')
+        summary = price_trips(self.calculator, self.trips_dir, output_path, chunksize=3, log=io.StringIO())
+        self.assertEqual(summary['rows'], 10)
+        self.check_output(pd.read_csv(output_path))
+
+    def test_price_trips_parquet_parallel(self):
+        output_path = os.path.join(self.temp_dir.name, 'prices.parquet')
+        summary = price_trips(self.calculator, self.trips_dir, output_path, chunksize=2, workers=2, log=None)
+        self.assertEqual(summary['rows'], 10)
+        self.check_output(pd.read_parquet(output_path))
+
+    def test_lightweight_calculator(self):
+        lightweight = _lightweight_calculator(self.calculator)
+        self.assertIsNone(lightweight.citibike_dataset.df_rides)
+        self.assertIsNotNone(self.calculator._traffic_table)
+        np.testing.assert_array_equal(lightweight.traffic_table, self.calculator.traffic_table)
+        self.assertEqual(lightweight.cost_per_accident, self.calculator.cost_per_accident)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -30,6 +30,104 @@ class TestDensityEstimator(unittest.TestCase):
         self.assertEqual(len(yedges), 51)
         self.assertTrue((H >= 0).all())
 
+    def test_service_area(self):
+        from datasets.service_area import ServiceArea
+        import pandas as pd
+        # Service area covering only the left half of the data.
+        stations = pd.DataFrame({'x_centered': [-5.0, 0.0, 0.0, -5.0], 'y_centered': [-5.0, -5.0, 5.0, 5.0]})
+        area = ServiceArea.from_stations(stations, buffer=0)
+
+        xx, yy, density = self.estimator.evaluate_grid(grid_size=20, service_area=area)
+        self.assertTrue(np.isnan(density[xx > 0]).all())
+        self.assertFalse(np.isnan(density[xx < 0]).any())
+
+        H, xedges, yedges = self.estimator.histogram2d(bins=20, service_area=area)
+        x_centers = (xedges[:-1] + xedges[1:]) / 2
+        self.assertEqual(H[x_centers > 0].sum(), 0)
+        self.assertGreater(H[x_centers < 0].sum(), 0)
+
+    def test_histogram2d_ratio(self):
+        numerator = DensityEstimator(self.data[:250], bandwidth=0.5)
+        H_norm, xedges, yedges = DensityEstimator.histogram2d_ratio(numerator, self.estimator, bins=20)
+        self.assertEqual(H_norm.shape, (20, 20))
+        self.assertTrue(((H_norm >= 0) & (H_norm <= 1)).all())
+        self.assertEqual(xedges[0], self.estimator.x_min)
+
+    def test_bandwidth_rules(self):
+        estimator = DensityEstimator(self.data, bandwidth='silverman')
+        # Standard normal data: Silverman's factor for n=500 in 2D is 500^(-1/6)
+        self.assertAlmostEqual(estimator.bandwidth, 500 ** (-1 / 6), delta=0.05)
+        self.assertEqual(estimator.bandwidth_selection['method'], 'silverman')
+
+        with self.assertRaises(ValueError):
+            DensityEstimator(self.data, bandwidth='unknown')
+
+    def test_bandwidth_cv(self):
+        options = {'n_candidates': 8, 'n_jobs': 1}
+        estimator = DensityEstimator(self.data, bandwidth='cv', bandwidth_options=options)
+        info = estimator.bandwidth_selection
+        self.assertTrue(0.1 < estimator.bandwidth < 1)
+        self.assertEqual(len(info['scores']), 8)
+        self.assertGreaterEqual(info['seconds'], 0)
+
+        # Scaling the data scales the selected bandwidth
+        scaled = DensityEstimator(self.data * 100, bandwidth='cv', bandwidth_options=options)
+        self.assertAlmostEqual(scaled.bandwidth, estimator.bandwidth * 100, places=6)
+
+    def test_deferred_kde(self):
+        estimator = DensityEstimator(self.data, bandwidth=0.5)
+        self.assertIsNone(estimator._kde_model)
+        estimator.evaluate_grid(grid_size=10)
+        self.assertIsNotNone(estimator._kde_model)
+
+    def test_accumulator(self):
+        x_range, y_range = (-3.0, 3.0), (-2.0, 4.0)
+        chunks = (self.data[i:i + 64] for i in range(0, len(self.data), 64))
+        accumulated = DensityEstimator.from_chunks(chunks, x_range, y_range, bins=30, bandwidth=0.5)
+        self.assertIsNone(accumulated.data)
+        inside = (np.abs(self.data[:, 0]) <= 3) & (self.data[:, 1] >= -2) & (self.data[:, 1] <= 4)
+        self.assertEqual(accumulated.n_samples, inside.sum())
+
+        # Same counts as np.histogram2d, including points on the edges and outside the range
+        edge_points = np.array([[3.0, 4.0], [-3.0, -2.0], [0.2, 0.2], [3.5, 0.0]])
+        accumulated.update(edge_points)
+        expected, _, _ = np.histogram2d(*np.vstack([self.data, edge_points]).T, bins=30, range=[x_range, y_range])
+        H, xedges, yedges = accumulated.histogram2d()
+        np.testing.assert_array_equal(H, expected)
+        self.assertEqual(accumulated.n_samples, H.sum())
+
+        in_memory = DensityEstimator(self.data, x_range=x_range, y_range=y_range)
+        np.testing.assert_allclose(accumulated.histogram2d(density=True)[0].sum(),
+                                   in_memory.histogram2d(bins=30, density=True)[0].sum())
+        with self.assertRaises(ValueError):
+            accumulated.histogram2d(bins=20)
+
+        # Ratios work between accumulated and in-memory estimators of the same range
+        H_norm, _, _ = DensityEstimator.histogram2d_ratio(in_memory, accumulated)
+        self.assertEqual(H_norm.shape, (30, 30))
+
+        # The binned KDE is fitted on first use
+        xx, yy, density = accumulated.evaluate_grid(grid_size=20)
+        self.assertEqual(density.shape, (20, 20))
+
+    def test_accumulator_bandwidth_selection(self):
+        accumulated = DensityEstimator.from_chunks([self.data], (-4, 4), (-4, 4), bins=100, bandwidth='silverman')
+        self.assertAlmostEqual(accumulated.bandwidth, 500 ** (-1 / 6), delta=0.05)
+
+        # The selected bandwidth follows the data added after its selection
+        growing = DensityEstimator(None, x_range=(-4, 4), y_range=(-4, 4), bins=100, bandwidth='scott')
+        growing.update(self.data[:50])
+        small_bandwidth = growing.bandwidth
+        growing.update(self.data[50:])
+        self.assertLess(growing.bandwidth, small_bandwidth)
+        self.assertEqual(growing.bandwidth_selection['method'], 'scott')
+        fresh = DensityEstimator.from_chunks([self.data], (-4, 4), (-4, 4), bins=100, bandwidth='scott')
+        self.assertAlmostEqual(growing.bandwidth, fresh.bandwidth)
+
+        empty = DensityEstimator(None, x_range=(0, 1), y_range=(0, 1), bins=10, bandwidth='scott')
+        with self.assertRaises(RuntimeError):
+            empty.kde_model
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+import os
+import tempfile
+from modeling.fingerprint import file_fingerprint
+
+
+class TestFileFingerprint(unittest.TestCase):
+
+    def test_file_and_directory(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'rides.csv')
+            with open(path, 'w') as f:
+                f.write('a')
+            fingerprint = file_fingerprint(temp_dir)
+            self.assertEqual(fingerprint, file_fingerprint(path))
+
+            # Changing the size or modification time changes the fingerprint
+            with open(path, 'w') as f:
+                f.write('ab')
+            self.assertNotEqual(file_fingerprint(temp_dir), fingerprint)
+
+        with self.assertRaises(FileNotFoundError):
+            file_fingerprint(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os
+import time
+import pickle
+import tempfile
+import threading
+import numpy as np
+from datetime import datetime
+from modeling.price_calculator import PriceCalculator
+from modeling.hot_reload import ReloadingPriceCalculator
+from pricing_fixtures import ConstantModel, citibike_dataset
+
+
+class TestReloadingPriceCalculator(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.temp_dir.name, 'model.pkl')
+        self.write_model(1.0)
+        self.probes = ([datetime(2023, 3, 1, 8, 15)], ['A1'])
+        self.calculator = ReloadingPriceCalculator(
+            lambda: PriceCalculator(self.model_path, citibike_dataset(['A1'], [0.0], [0.0]), traffic_adjustment=1),
+            [self.model_path], probes=self.probes, poll_interval=0.01)
+
+    def tearDown(self):
+        self.calculator.stop()
+        self.temp_dir.cleanup()
+
+    def write_model(self, value):
+        # Replace the file atomically and bump its mtime, as a deployment would
+        tmp_path = self.model_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(ConstantModel(value), f)
+        os.replace(tmp_path, self.model_path)
+        mtime = time.time() + getattr(self, 'n_writes', 0)
+        os.utime(self.model_path, (mtime, mtime))
+        self.n_writes = getattr(self, 'n_writes', 0) + 1
+
+    def price(self):
+        return self.calculator.predict_insurance_price(datetime(2023, 3, 1, 8, 15), 'A1')[0]
+
+    def test_reload_on_change(self):
+        # 1 crash / 2 traffic * 5000
+        self.assertAlmostEqual(self.price(), 2500)
+        self.assertFalse(self.calculator.reload())
+
+        self.write_model(2.0)
+        self.assertTrue(self.calculator.changed())
+        self.assertTrue(self.calculator.reload())
+        self.assertAlmostEqual(self.price(), 5000)
+        self.assertEqual(self.calculator.status['version'], 2)
+        self.assertGreaterEqual(self.calculator.status['last_reload_seconds'], 0)
+
+    def test_failed_validation_keeps_old_version(self):
+        self.write_model(np.nan)
+        self.assertFalse(self.calculator.reload())
+
+        status = self.calculator.status
+        self.assertEqual(status['version'], 1)
+        self.assertEqual(status['n_failed_reloads'], 1)
+        self.assertIn('Probe quotes', status['last_error'])
+        self.assertAlmostEqual(self.price(), 2500)
+        # The broken sources are not rebuilt until they change again
+        self.assertFalse(self.calculator.changed())
+
+    def test_background_reload(self):
+        self.calculator.start()
+        stop = threading.Event()
+        prices = []
+
+        def quote():
+            while not stop.is_set():
+                prices.append(self.price())
+
+        quoting = threading.Thread(target=quote)
+        quoting.start()
+        self.write_model(3.0)
+
+        deadline = time.time() + 5
+        while self.calculator.version < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        stop.set()
+        quoting.join()
+
+        self.assertEqual(self.calculator.version, 2)
+        # Every quote was served by one consistent version
+        self.assertTrue(set(np.round(prices, 6)) <= {2500.0, 7500.0})
+
+    def test_initial_failure(self):
+        with self.assertRaises(RuntimeError):
+            ReloadingPriceCalculator(lambda: 1 / 0, [self.model_path])
+
+
+if __name__ == '__main__':
+    unittest.main()
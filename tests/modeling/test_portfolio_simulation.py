@@ -0,0 +1,82 @@
+import unittest
+import numpy as np
+import pandas as pd
+from modeling.price_calculator import PriceCalculator
+from modeling.portfolio_simulation import PortfolioLossSimulator
+from pricing_fixtures import ConstantModel, citibike_dataset
+
+
+class TestPortfolioSimulation(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.risk = rng.uniform(0, 0.002, 5000)
+        self.risk[0] = np.nan
+
+    def test_poisson_moments(self):
+        simulator = PortfolioLossSimulator(self.risk, cost_per_accident=5000, traffic_adjustment=1, severity_sigma=0,
+                                           random_state=1)
+        losses = simulator.simulate(n_scenarios=20000)
+        self.assertEqual(losses.shape, (20000,))
+
+        summary = simulator.summary()
+        expected = np.nansum(self.risk) * 5000
+        self.assertAlmostEqual(summary['expected_loss'], expected)
+        self.assertAlmostEqual(summary['mean_loss'], expected, delta=0.02 * expected)
+        # Poisson variance of the crash count equals its mean.
+        self.assertAlmostEqual(summary['std_loss'], 5000 * np.sqrt(np.nansum(self.risk)), delta=0.05 * summary['std_loss'])
+        self.assertLessEqual(summary['quantiles'][0.5], summary['quantiles'][0.995])
+
+    def test_bernoulli_and_severity(self):
+        # A budget of 300 scenarios x 1000 rides per draw
+        simulator = PortfolioLossSimulator(self.risk, traffic_adjustment=1, severity_sigma=1.0, method='bernoulli',
+                                           chunk_size=300, memory_budget=9 * 300 * 1000, random_state=2)
+        simulator.simulate(n_scenarios=2000)
+        summary = simulator.summary()
+        self.assertAlmostEqual(summary['mean_loss'], summary['expected_loss'], delta=0.1 * summary['expected_loss'])
+
+    def test_reproducible_and_parallel(self):
+        kwargs = dict(traffic_adjustment=1, chunk_size=100, random_state=3)
+        losses = PortfolioLossSimulator(self.risk, **kwargs).simulate(1000)
+        losses_parallel = PortfolioLossSimulator(self.risk, n_jobs=2, **kwargs).simulate(1000)
+        np.testing.assert_array_equal(losses, losses_parallel)
+
+    def test_premium_adequacy(self):
+        premiums = np.full(len(self.risk), 1e6)
+        simulator = PortfolioLossSimulator(self.risk, traffic_adjustment=1, premiums=premiums, random_state=4)
+        with self.assertRaises(RuntimeError):
+            simulator.summary()
+        simulator.simulate(500)
+        summary = simulator.summary()
+        self.assertEqual(summary['premium_adequacy'], 1.0)
+        self.assertLess(summary['loss_ratio'], 1.0)
+
+    def test_negative_risks(self):
+        # Negative model predictions count as zero risk with both methods
+        risk = np.array([-0.5, 0.001, -0.2])
+        for method in ['poisson', 'bernoulli']:
+            simulator = PortfolioLossSimulator(risk, traffic_adjustment=1, severity_sigma=0, method=method, random_state=5)
+            simulator.simulate(100)
+            self.assertAlmostEqual(simulator.summary()['expected_loss'], 0.001 * 5000)
+
+    def test_priced_portfolio(self):
+        calculator = PriceCalculator(ConstantModel(2.0), citibike_dataset(['A1', 'B1'], [100.0, 200.0], [200.0, 200.0]),
+                                     cost_per_accident=5000)
+        rng = np.random.default_rng(6)
+        started_at = pd.Timestamp('2023-03-01') + pd.to_timedelta(rng.integers(0, 1440, 20000), unit='min')
+        station_ids = rng.choice(['A1', 'B1'], 20000)
+        prices, risks = calculator.predict_insurance_prices(started_at, station_ids)
+
+        simulator = PortfolioLossSimulator(risks, cost_per_accident=calculator.cost_per_accident,
+                                           traffic_adjustment=calculator.traffic_adjustment, premiums=prices,
+                                           random_state=7)
+        simulator.simulate(2000)
+        summary = simulator.summary()
+        # Premiums priced at exactly the expected cost
+        self.assertAlmostEqual(summary['loss_ratio'], 1.0)
+        self.assertAlmostEqual(summary['mean_loss'], summary['total_premium'], delta=0.05 * summary['total_premium'])
+        self.assertTrue(0.2 < summary['premium_adequacy'] < 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
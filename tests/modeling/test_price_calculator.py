@@ -6,12 +6,18 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 from modeling.price_calculator import PriceCalculator
+from modeling.traffic_counter import SlidingWindowTrafficCounter
 
 # Dummy model that always predicts a crash count of 2.0.
 class DummyModel:
     def predict(self, X):
         return np.array([2.0])
 
+# Dummy model that predicts a crash count of 2.0 for every row.
+class DummyBatchModel:
+    def predict(self, X):
+        return np.full(len(X), 2.0)
+
 # Dummy CitibikeDataset with minimal required attributes.
 class DummyCitibikeDataset:
     def __init__(self):
@@ -21,6 +27,8 @@ class DummyCitibikeDataset:
             'x_centered': [100.0],
             'y_centered': [200.0]
         })
+        self.x_center = 0.0
+        self.y_center = 0.0
         # Rides DataFrame with one ride that starts and ends at station A1.
         # The ride's times are chosen so that the time bin (with time_bin_size=30)
         # for both start and end fall into the same bin.
@@ -75,5 +83,89 @@ class TestPriceCalculator(unittest.TestCase):
         self.assertAlmostEqual(risk_per_ride, 1.0, places=3)
         self.assertAlmostEqual(insurance_price, 5.0, places=3)
 
+    def test_predict_insurance_price_traffic_counter(self):
+        # Four events in the bin of 8:07 at A1 give a risk of 2.0 / 4 = 0.5 instead of 1.0.
+        counter = SlidingWindowTrafficCounter(time_bin_size=30)
+        for minute in [0, 5, 10, 15]:
+            counter.add('A1', datetime(2023, 3, 1, 8, minute))
+        calculator = PriceCalculator(self.temp_model_file.name, self.dummy_citibike, traffic_counter=counter)
+
+        _, risk_per_ride = calculator.predict_insurance_price(datetime(2023, 3, 1, 8, 7), "A1")
+        self.assertAlmostEqual(risk_per_ride, 0.5, places=3)
+
+        with self.assertRaises(ValueError):
+            PriceCalculator(self.temp_model_file.name, self.dummy_citibike, time_bin_size=15, traffic_counter=counter)
+
+    def test_predict_insurance_prices(self):
+        # Batched pricing gives the same result as single pricing, unknown stations get NaN.
+        with open(self.temp_model_file.name, 'wb') as f:
+            pickle.dump(DummyBatchModel(), f)
+        calculator = PriceCalculator(self.temp_model_file.name, self.dummy_citibike)
+
+        started_at = [datetime(2023, 3, 1, 8, 7), datetime(2023, 3, 1, 12, 0), datetime(2023, 3, 1, 8, 7)]
+        prices, risks = calculator.predict_insurance_prices(started_at, ['A1', 'A1', 'X1'])
+        np.testing.assert_allclose(risks, [1.0, 2.0, np.nan])
+        np.testing.assert_allclose(prices, [5.0, 10.0, np.nan])
+        self.assertEqual(calculator.traffic_table.shape, (1, 48))
+
+    def test_rides_with_missing_times(self):
+        # Rides whose times could not be parsed (NaT) are not counted as traffic.
+        self.dummy_citibike.df_rides = pd.concat([self.dummy_citibike.df_rides, pd.DataFrame({
+            'start_station_id': ['A1'],
+            'started_at': [pd.NaT],
+            'end_station_id': ['A1'],
+            'ended_at': [pd.NaT]
+        })], ignore_index=True)
+        calculator = PriceCalculator(self.temp_model_file.name, self.dummy_citibike)
+
+        insurance_price, risk_per_ride = calculator.predict_insurance_price(datetime(2023, 3, 1, 8, 7), "A1")
+        self.assertAlmostEqual(risk_per_ride, 1.0, places=3)
+        self.assertAlmostEqual(insurance_price, 5.0, places=3)
+
+    def test_predict_insurance_prices_bad_times(self):
+        # Mixed timestamp formats are parsed, missing and invalid start times get NaN.
+        with open(self.temp_model_file.name, 'wb') as f:
+            pickle.dump(DummyBatchModel(), f)
+        calculator = PriceCalculator(self.temp_model_file.name, self.dummy_citibike)
+
+        started_at = ['2023-03-01 08:07:03', '2023-03-01 08:07:03.389', None, 'invalid']
+        prices, risks = calculator.predict_insurance_prices(started_at, ['A1'] * 4)
+        np.testing.assert_allclose(risks, [1.0, 1.0, np.nan, np.nan])
+
+    def test_predict_insurance_price_unknown_station(self):
+        calculator = PriceCalculator(self.temp_model_file.name, self.dummy_citibike)
+        with self.assertRaises(ValueError):
+            calculator.predict_insurance_price(datetime(2023, 3, 1, 8, 7), "unknown")
+
+    def test_predict_insurance_price_at(self):
+        """
+        A second station B1 without traffic is added 100 meters east of A1. A start position 25 meters 
+        east of A1 is snapped to A1 (risk 1.0) or interpolated between A1 (risk 1.0, distance 25) and
+        B1 (risk 2.0, distance 75) with weights 3:1, which gives a risk of 1.25.
+        """
+        self.dummy_citibike.stations = pd.DataFrame({
+            'station_id': ['A1', 'B1'],
+            'x_centered': [100.0, 200.0],
+            'y_centered': [200.0, 200.0]
+        })
+        with open(self.temp_model_file.name, 'wb') as f:
+            pickle.dump(DummyBatchModel(), f)
+        calculator = PriceCalculator(self.temp_model_file.name, self.dummy_citibike)
+
+        import pyproj
+        transformer = pyproj.Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+        lng, lat = transformer.transform(125.0, 200.0)
+        ride_start = datetime(2023, 3, 1, 8, 7)
+
+        _, risk_per_ride = calculator.predict_insurance_price_at(ride_start, lat, lng, k=1)
+        self.assertAlmostEqual(risk_per_ride, 1.0, places=3)
+
+        insurance_price, risk_per_ride = calculator.predict_insurance_price_at(ride_start, lat, lng, k=2)
+        self.assertAlmostEqual(risk_per_ride, 1.25, places=3)
+        self.assertAlmostEqual(insurance_price, 6.25, places=3)
+
+        with self.assertRaises(ValueError):
+            calculator.predict_insurance_price_at(ride_start, lat, lng, max_distance=10)
+
 if __name__ == '__main__':
     unittest.main()
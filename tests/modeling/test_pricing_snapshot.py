@@ -0,0 +1,58 @@
+import unittest
+import os
+import pickle
+import tempfile
+import numpy as np
+import pyproj
+from datetime import datetime
+from modeling.price_calculator import PriceCalculator
+from pricing_fixtures import ConstantModel, citibike_dataset
+
+
+class TestPricingSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        model_path = os.path.join(self.temp_dir.name, 'model.pkl')
+        with open(model_path, 'wb') as f:
+            pickle.dump(ConstantModel(2.0), f)
+        # Two stations with consistent geographic and projected coordinates
+        lat, lng = np.array([40.75, 40.76]), np.array([-73.99, -73.98])
+        x, y = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True).transform(lng, lat)
+        dataset = citibike_dataset(['A1', 'B1'], x - x.mean(), y - y.mean(), x.mean(), y.mean(), lat=lat, lng=lng)
+        self.calculator = PriceCalculator(model_path, dataset, cost_per_accident=4000)
+        self.snapshot_path = os.path.join(self.temp_dir.name, 'pricing_snapshot.npz')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_roundtrip(self):
+        self.calculator.save_snapshot(self.snapshot_path)
+        self.assertFalse(os.path.exists(self.snapshot_path + '.tmp'))
+        calculator = PriceCalculator.from_snapshot(self.snapshot_path)
+
+        self.assertIsNone(calculator.citibike_dataset.df_rides)
+        self.assertEqual(calculator.cost_per_accident, 4000)
+        self.assertEqual(calculator.snapshot_meta['format_version'], 1)
+        np.testing.assert_array_equal(calculator.traffic_table, self.calculator.traffic_table)
+
+        started_at = [datetime(2023, 3, 1, 8, 7), datetime(2023, 3, 1, 9, 0)]
+        np.testing.assert_allclose(calculator.predict_insurance_prices(started_at, ['A1', 'B1']),
+                                   self.calculator.predict_insurance_prices(started_at, ['A1', 'B1']))
+        self.assertAlmostEqual(calculator.predict_insurance_price(started_at[0], 'A1')[1], 1.0)
+        self.assertAlmostEqual(calculator.predict_insurance_price_at(started_at[0], 40.76, -73.98)[1], 2.0)
+
+    def test_corrupted_snapshot(self):
+        self.calculator.save_snapshot(self.snapshot_path)
+        with np.load(self.snapshot_path) as data:
+            arrays = {key: data[key] for key in data.files}
+        arrays['traffic'] = arrays['traffic'] + 1
+        with open(self.snapshot_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+
+        with self.assertRaises(ValueError):
+            PriceCalculator.from_snapshot(self.snapshot_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
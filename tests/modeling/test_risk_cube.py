@@ -0,0 +1,64 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from modeling.risk_cube import RiskCube
+
+
+# Dummy model that is linear in x and y and independent of the time of day.
+class LinearModel:
+    def predict(self, X):
+        return 2 * X[:, 0] + 3 * X[:, 1] + 1
+
+# Dummy model that only depends on the time of day.
+class TimeModel:
+    def predict(self, X):
+        return X[:, 2]
+
+
+class DummyCitibikeDataset:
+    def __init__(self):
+        self.stations = pd.DataFrame({
+            'station_id': ['A1', 'B1', 'C1'],
+            'x_centered': [-100.0, 0.0, 100.0],
+            'y_centered': [-50.0, 50.0, 0.0]
+        })
+
+
+class TestRiskCube(unittest.TestCase):
+
+    def test_build_and_linear_query(self):
+        cube = RiskCube.from_dataset(LinearModel(), DummyCitibikeDataset(), shape=(11, 5, 4), batch_size=7)
+        self.assertEqual(cube.values.shape, (11, 5, 4))
+        self.assertEqual(cube.x_range, (-100.0, 100.0))
+
+        rng = np.random.default_rng(0)
+        x = rng.uniform(-100, 100, 1000)
+        y = rng.uniform(-50, 50, 1000)
+        t = rng.uniform(0, 1440, 1000)
+        np.testing.assert_allclose(cube.query(x, y, t), 2 * x + 3 * y + 1, rtol=1e-4, atol=1e-3)
+
+        self.assertTrue(np.isnan(cube.query(150.0, 0.0, 600.0)))
+        self.assertEqual(cube.query(150.0, 0.0, 600.0, fill_value=0), 0)
+
+    def test_periodic_time_and_nearest(self):
+        # Time nodes are at 180, 540, 900 and 1260 minutes.
+        cube = RiskCube.build(TimeModel(), (0, 1), (0, 1), shape=(2, 2, 4))
+        np.testing.assert_allclose(cube.query(0.5, 0.5, [360, 180, 0, 1440 + 180]), [360, 180, 720, 180])
+        np.testing.assert_allclose(cube.query(0.5, 0.5, [350, 10, 1430], method='nearest'), [180, 180, 1260])
+        with self.assertRaises(ValueError):
+            cube.query(0.5, 0.5, 0, method='cubic')
+
+    def test_save_load(self):
+        cube = RiskCube.build(LinearModel(), (0, 10), (0, 20), shape=(3, 3, 2))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'risk_cube.npz')
+            cube.save(path)
+            loaded = RiskCube.load(path)
+        np.testing.assert_array_equal(loaded.values, cube.values)
+        self.assertEqual(loaded.y_range, (0.0, 20.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
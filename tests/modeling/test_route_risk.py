@@ -0,0 +1,71 @@
+import unittest
+import os
+import json
+import tempfile
+import numpy as np
+import pandas as pd
+from modeling.route_risk import (
+    StraightLineRouter, FileRouter, RouteRiskMatrix, integrate_routes
+)
+
+
+class TestRouteRisk(unittest.TestCase):
+    def setUp(self):
+        # Uniform density of 1 on a 100 x 100 meter raster, so integrals equal route lengths.
+        self.H = np.ones((10, 10))
+        self.xedges = np.linspace(0, 100, 11)
+        self.yedges = np.linspace(0, 100, 11)
+        self.stations = pd.DataFrame({
+            'station_id': ['A', 'B', 'C'],
+            'x_centered': [10.0, 90.0, 10.0],
+            'y_centered': [10.0, 10.0, 70.0]
+        })
+
+    def test_integrate_routes(self):
+        vertices, offsets = StraightLineRouter().route(
+            np.array([[10.0, 10.0], [0.0, 50.0]]), np.array([[90.0, 10.0], [200.0, 50.0]]))
+        integral, length = integrate_routes(vertices, offsets, self.H, self.xedges, self.yedges, spacing=5)
+
+        np.testing.assert_allclose(length, [80, 200])
+        # The second route leaves the raster after 100 meters.
+        np.testing.assert_allclose(integral, [80, 100])
+
+    def test_build_and_lookup(self):
+        matrix = RouteRiskMatrix.build(self.stations, self.H * 100, self.xedges, self.yedges, max_pairs=4)
+
+        self.assertEqual(matrix.risk.shape, (3, 3))
+        self.assertAlmostEqual(matrix.lookup('A', 'B'), 80, places=3)
+        self.assertAlmostEqual(matrix.lookup('A', 'C'), 60, places=3)
+        self.assertAlmostEqual(matrix.lookup('B', 'B'), 0)
+        np.testing.assert_allclose(matrix.lookup_many(['C', 'X'], ['A', 'A']), [60, np.nan], rtol=1e-5)
+
+    def test_file_router_and_save_load(self):
+        # Route from A to B via a detour, given in the centered frame with center (0, 0).
+        import pyproj
+        transformer = pyproj.Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+        lng, lat = transformer.transform([10.0, 10.0, 90.0, 90.0], [10.0, 50.0, 50.0, 10.0])
+        geojson = {'type': 'FeatureCollection', 'features': [{
+            'type': 'Feature',
+            'properties': {'origin': 'A', 'destination': 'B'},
+            'geometry': {'type': 'LineString', 'coordinates': list(map(list, zip(lng, lat)))}
+        }]}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            route_path = os.path.join(tmp_dir, 'routes.geojson')
+            with open(route_path, 'w') as f:
+                json.dump(geojson, f)
+
+            router = FileRouter(route_path, x_center=0, y_center=0)
+            matrix = RouteRiskMatrix.build(self.stations, self.H * 100, self.xedges, self.yedges, router=router)
+            self.assertAlmostEqual(matrix.lookup('A', 'B'), 160, places=2)
+            self.assertAlmostEqual(matrix.lookup('B', 'A'), 80, places=2)
+
+            matrix_path = os.path.join(tmp_dir, 'route_risk.npz')
+            matrix.save(matrix_path)
+            loaded = RouteRiskMatrix.load(matrix_path)
+            np.testing.assert_array_equal(loaded.risk, matrix.risk)
+            self.assertEqual(list(loaded.station_ids), ['A', 'B', 'C'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import pandas as pd
+from modeling.station_exposure import station_crash_exposure
+
+
+class DummyCrashDataset:
+    def __init__(self):
+        self.df = pd.DataFrame({
+            'CRASH TIME': ['0:10', '0:50', '13:05', '23:59', '12:00'],
+            'x': [1010.0, 1000.0, 1100.0, 1050.0, 9000.0],
+            'y': [2000.0, 2000.0, 2000.0, 2000.0, 9000.0]
+        })
+
+
+class DummyCitibikeDataset:
+    def __init__(self):
+        self.x_center = 1000.0
+        self.y_center = 2000.0
+        self.stations = pd.DataFrame({
+            'station_id': ['A1', 'B1'],
+            'x_centered': [0.0, 100.0],
+            'y_centered': [0.0, 0.0]
+        })
+
+
+class TestStationExposure(unittest.TestCase):
+    def test_station_crash_exposure(self):
+        exposure = station_crash_exposure(
+            DummyCrashDataset(), DummyCitibikeDataset(), radius=60, time_bin_size=60, chunk_size=2)
+
+        self.assertEqual(exposure.shape, (2, 24))
+        self.assertEqual(list(exposure.index), ['A1', 'B1'])
+        # A1: crashes at 0:10 and 0:50 (bin 0) and at 23:59 (bin 23, 50 m away).
+        self.assertEqual(exposure.loc['A1', 0], 2)
+        self.assertEqual(exposure.loc['A1', 23], 1)
+        # B1: crashes at 13:05 (bin 13) and 23:59 (bin 23). The far away crash is not counted.
+        self.assertEqual(exposure.loc['B1', 13], 1)
+        self.assertEqual(exposure.loc['B1', 23], 1)
+        self.assertEqual(exposure.values.sum(), 5)
+
+    def test_radius_in_meters(self):
+        # In New York 100 projected units are about 76 meters on the ground
+        crashes = DummyCrashDataset()
+        citibike = DummyCitibikeDataset()
+        citibike.y_center = 4975000.0
+        crashes.df['y'] += citibike.y_center - 2000.0
+
+        exposure = station_crash_exposure(crashes, citibike, radius=80, time_bin_size=60)
+        self.assertEqual(exposure.loc['A1', 13], 1)
+        exposure = station_crash_exposure(crashes, citibike, radius=70, time_bin_size=60)
+        self.assertEqual(exposure.loc['A1', 13], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import pandas as pd
+import pyproj
+from modeling.station_locator import StationLocator
+
+
+class TestStationLocator(unittest.TestCase):
+    def setUp(self):
+        self.stations = pd.DataFrame({
+            'station_id': ['A1', 'B1', 'C1', 'D1'],
+            'x_centered': [0.0, 100.0, 0.0, 1000.0],
+            'y_centered': [0.0, 0.0, 100.0, 1000.0]
+        })
+        self.x_center = -8235000.0
+        self.y_center = 4975000.0
+        self.locator = StationLocator(self.stations, self.x_center, self.y_center)
+
+    def test_query(self):
+        distances, indices = self.locator.query(np.array([[10.0, 0.0], [900.0, 950.0]]), k=2)
+        self.assertEqual(distances.shape, (2, 2))
+        self.assertEqual(list(indices[0]), [0, 1])
+        self.assertEqual(indices[1, 0], 3)
+        self.assertAlmostEqual(distances[0, 0], 10.0)
+
+    def test_query_radius(self):
+        counts = self.locator.query_radius(np.array([[0.0, 0.0], [5000.0, 5000.0]]), 150, count_only=True)
+        self.assertEqual(list(counts), [3, 0])
+        indices = self.locator.query_radius(np.array([[0.0, 0.0]]), 50)
+        self.assertEqual(list(indices[0]), [0])
+
+    def test_nearest_station_ids(self):
+        transformer = pyproj.Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+        lng, lat = transformer.transform(
+            np.array([90.0, 5000.0]) + self.x_center, np.array([5.0, 5000.0]) + self.y_center)
+
+        np.testing.assert_allclose(self.locator.project(lat, lng), [[90.0, 5.0], [5000.0, 5000.0]], atol=1e-3)
+        self.assertEqual(list(self.locator.nearest_station_ids(lat, lng)), ['B1', 'D1'])
+        self.assertEqual(list(self.locator.nearest_station_ids(lat, lng, max_distance=500)), ['B1', None])
+        # B1 is 11.2 projected units away, which is about 8.5 meters on the ground
+        self.assertEqual(list(self.locator.nearest_station_ids(lat, lng, max_distance=10)), ['B1', None])
+        self.assertEqual(list(self.locator.nearest_station_ids(lat, lng, max_distance=8)), [None, None])
+
+    def test_scale(self):
+        lat = np.array([0.0, 40.75])
+        xy = self.locator.project(lat, np.zeros(2))
+        np.testing.assert_allclose(self.locator.scale(xy), 1 / np.cos(np.radians(lat)))
+
+
+if __name__ == '__main__':
+    unittest.main()
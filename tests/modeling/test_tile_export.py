@@ -0,0 +1,78 @@
+import unittest
+import os
+import json
+import tempfile
+import numpy as np
+from PIL import Image
+from modeling.tile_export import export_tile_pyramid, tiles_covering, tile_bounds, colorize
+
+
+class TestTileExport(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # 10 x 10 raster of 100 m cells around Manhattan, with a single hot cell in the north-east corner
+        self.x_center, self.y_center = -8235000.0, 4975000.0
+        self.extent = [-500.0, 500.0, -500.0, 500.0]
+        self.H = np.zeros((10, 10))
+        self.H[9, 9] = 5.0
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_tile_math(self):
+        self.assertEqual(tiles_covering((-1, -1, 1, 1), 0), [(0, 0, 0)])
+        self.assertEqual(len(tiles_covering((-1, -1, 1, 1), 1)), 4)
+        x_min, y_min, x_max, y_max = tile_bounds(1, 1, 0)
+        self.assertAlmostEqual(x_min, 0)
+        self.assertAlmostEqual(y_min, 0)
+
+    def test_colorize(self):
+        rgba, vmin, vmax = colorize(np.array([[0.0, 1.0], [10.0, np.nan]]), norm='log', opacity=1)
+        self.assertEqual((vmin, vmax), (1.0, 10.0))
+        np.testing.assert_array_equal(rgba[..., 3], [[0, 255], [255, 0]])
+
+        with self.assertRaises(ValueError):
+            colorize(self.H, norm='sqrt')
+
+    def test_export(self):
+        summary = export_tile_pyramid(self.H, self.extent, self.temp_dir.name, self.x_center, self.y_center,
+                                      zoom_levels=range(12, 18), n_jobs=1)
+
+        files = [os.path.join(root, f) for root, _, fs in os.walk(self.temp_dir.name) for f in fs if f.endswith('.png')]
+        self.assertEqual(len(files), summary['written'])
+        self.assertGreater(summary['skipped'], 0)
+
+        # Only the hot cell is visible, it is covered by at least one tile on every zoom level
+        zoom_levels = {int(os.path.relpath(f, self.temp_dir.name).split(os.sep)[0]) for f in files}
+        self.assertEqual(zoom_levels, set(range(12, 18)))
+
+        image = np.array(Image.open(files[0]))
+        self.assertEqual(image.shape, (256, 256, 4))
+        self.assertTrue(image[..., 3].any())
+
+        with open(os.path.join(self.temp_dir.name, 'metadata.json')) as f:
+            metadata = json.load(f)
+        self.assertEqual((metadata['minzoom'], metadata['maxzoom']), (12, 17))
+        west, south, east, north = metadata['bounds']
+        self.assertTrue(-74.0 < west < east < -73.9)
+        self.assertTrue(40.7 < south < north < 40.8)
+
+    def test_parallel_matches_serial(self):
+        serial_dir = os.path.join(self.temp_dir.name, 'serial')
+        parallel_dir = os.path.join(self.temp_dir.name, 'parallel')
+        H = np.random.default_rng(0).random((10, 10))
+        export_tile_pyramid(H, self.extent, serial_dir, self.x_center, self.y_center, zoom_levels=[15, 16], n_jobs=1)
+        export_tile_pyramid(H, self.extent, parallel_dir, self.x_center, self.y_center, zoom_levels=[15, 16],
+                            n_jobs=2, batch_size=2)
+
+        for root, _, files in os.walk(serial_dir):
+            for file in files:
+                if file.endswith('.png'):
+                    relative = os.path.relpath(os.path.join(root, file), serial_dir)
+                    np.testing.assert_array_equal(np.array(Image.open(os.path.join(serial_dir, relative))),
+                                                  np.array(Image.open(os.path.join(parallel_dir, relative))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import os
+import json
+import queue
+import tempfile
+import threading
+from modeling.traffic_counter import SlidingWindowTrafficCounter, follow_file, iter_queue
+
+
+class TestTrafficCounter(unittest.TestCase):
+
+    def test_sliding_window(self):
+        counter = SlidingWindowTrafficCounter(window='2D', bucket_size='1D', time_bin_size=30)
+        counter.add('A1', '2023-12-01 08:05')
+        counter.add('A1', '2023-12-01 08:20')
+        counter.add('A1', '2023-12-02 08:10')
+        counter.add('B1', '2023-12-02 09:00')
+        self.assertEqual(counter.count('A1', 16), 3)
+        self.assertEqual(counter.count('B1', 18), 1)
+
+        # The first day leaves the window, late events from before the window are dropped.
+        counter.add('B1', '2023-12-03 09:00')
+        self.assertEqual(counter.count('A1', 16), 1)
+        counter.add('A1', '2023-12-01 08:05')
+        self.assertEqual(counter.count('A1', 16), 1)
+        self.assertEqual(counter.n_dropped, 1)
+
+        # Late events within the window are counted.
+        counter.add('A1', '2023-12-02 08:15')
+        self.assertEqual(counter.count('A1', 16), 2)
+
+        # Batched events count with their multiplicity.
+        n_events = counter.n_events
+        counter.add('A1', '2023-12-02 08:20', count=5)
+        self.assertEqual(counter.count('A1', 16), 7)
+        self.assertEqual(counter.n_events, n_events + 5)
+        self.assertLessEqual(len(counter.buckets), 2)
+
+    def test_sketch(self):
+        counter = SlidingWindowTrafficCounter(window='1D', bucket_size='1h', sketch_width=512)
+        for minute in range(0, 60, 5):
+            counter.add('A1', f'2023-12-01 08:{minute:02d}')
+        counter.add('B1', '2023-12-01 08:00')
+        self.assertGreaterEqual(counter.count('A1', 16), 6)
+        self.assertGreaterEqual(counter.count('A1', 17), 6)
+        self.assertGreaterEqual(counter.count('B1', 16), 1)
+
+        counter.add('B1', '2023-12-02 10:00')
+        self.assertEqual(counter.count('A1', 16), 0)
+        self.assertEqual(counter.count('B1', 20), 1)
+
+    def test_sources(self):
+        events = [
+            {'event': 'start', 'station_id': 'A1', 'timestamp': '2023-12-01T08:05:00'},
+            {'event': 'end', 'station_id': 'A1', 'timestamp': '2023-12-01T08:10:00'},
+        ]
+
+        event_queue = queue.Queue()
+        for event in events:
+            event_queue.put(event)
+        event_queue.put(None)
+        counter = SlidingWindowTrafficCounter()
+        counter.consume(iter_queue(event_queue))
+        self.assertEqual(counter.count('A1', 16), 2)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'events.jsonl')
+            with open(path, 'w') as f:
+                f.write(json.dumps(events[0]) + '\n')
+
+            stop_event = threading.Event()
+            counter = SlidingWindowTrafficCounter()
+            counter.start(follow_file(path, poll_interval=0.01, stop_event=stop_event))
+            with open(path, 'a') as f:
+                f.write(json.dumps(events[1]) + '\n')
+
+            for _ in range(500):
+                if counter.n_events == 2:
+                    break
+                stop_event.wait(0.01)
+            stop_event.set()
+            counter.stop(timeout=1)
+            self.assertEqual(counter.count('A1', 16), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
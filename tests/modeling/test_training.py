@@ -0,0 +1,95 @@
+import unittest
+import os
+import json
+import pickle
+import tempfile
+import numpy as np
+import pandas as pd
+import pyproj
+from sklearn.linear_model import Ridge
+from sklearn.tree import DecisionTreeRegressor
+from modeling.training import search_models, train
+
+
+class TestTraining(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+
+        # Rides between four stations around midtown Manhattan.
+        lat = np.array([40.75, 40.76, 40.74, 40.75])
+        lng = np.array([-73.99, -73.98, -73.98, -73.97])
+        n_rides = 20
+        start, end = rng.integers(0, 4, n_rides), rng.integers(0, 4, n_rides)
+        started_at = pd.Timestamp('2023-12-01 06:00') + pd.to_timedelta(rng.integers(0, 720, n_rides), unit='min')
+        pd.DataFrame({
+            'ride_id': [str(i) for i in range(n_rides)],
+            'rideable_type': ['classic_bike'] * n_rides,
+            'started_at': started_at,
+            'ended_at': started_at + pd.Timedelta(minutes=10),
+            'start_station_name': [f'S{i}' for i in start],
+            'start_station_id': [f'S{i}' for i in start],
+            'end_station_name': [f'S{i}' for i in end],
+            'end_station_id': [f'S{i}' for i in end],
+            'start_lat': lat[start], 'start_lng': lng[start],
+            'end_lat': lat[end], 'end_lng': lng[end],
+            'member_casual': ['member'] * n_rides
+        }).to_csv(os.path.join(self.temp_dir.name, 'rides.csv'), index=False)
+
+        # Preprocessed crashes inside the station area.
+        n_crashes = 200
+        crash_lat = rng.uniform(40.74, 40.76, n_crashes)
+        crash_lng = rng.uniform(-73.99, -73.97, n_crashes)
+        x, y = pyproj.Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True).transform(crash_lng, crash_lat)
+        minutes = rng.integers(0, 24 * 60, n_crashes)
+        pd.DataFrame({
+            'CRASH DATE': ['12/01/2023'] * n_crashes,
+            'CRASH TIME': [f'{m // 60}:{m % 60:02d}' for m in minutes],
+            'LATITUDE': crash_lat, 'LONGITUDE': crash_lng,
+            'CRASH_DATETIME': ['2023-12-01'] * n_crashes,
+            'x': x, 'y': y
+        }).to_csv(os.path.join(self.temp_dir.name, 'crashes.csv'), index=False)
+
+        self.search_space = [
+            {'name': 'Ridge', 'estimator': Ridge(), 'param_grid': {'alpha': [0.1, 1.0]}},
+            {'name': 'Tree', 'estimator': DecisionTreeRegressor(random_state=0), 'param_grid': {'max_depth': [1, 2, 3]}},
+        ]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_search_models(self):
+        rng = np.random.default_rng(1)
+        X = rng.normal(size=(60, 3))
+        y = (X[:, 0] > 0).astype(float)
+
+        candidates = search_models(X, y, self.search_space, cv=3, n_jobs=2)
+        self.assertEqual(len(candidates), 5)
+        self.assertEqual(candidates[0]['name'], 'Tree')
+        self.assertTrue(all(a['mse'] <= b['mse'] for a, b in zip(candidates, candidates[1:])))
+
+        self.assertEqual(len(search_models(X, y, self.search_space, budget=2, n_jobs=1)), 2)
+
+    def test_train(self):
+        output_dir = os.path.join(self.temp_dir.name, 'fitted_models')
+        kwargs = dict(output_dir=output_dir, bins=5, time_bin_size=120, search_space=self.search_space, n_jobs=2)
+        metadata = train(os.path.join(self.temp_dir.name, 'crashes.csv'),
+                         os.path.join(self.temp_dir.name, 'rides.csv'), **kwargs)
+
+        with open(os.path.join(output_dir, 'crash_model.pkl'), 'rb') as f:
+            model = pickle.load(f)
+        self.assertEqual(model.predict(np.zeros((2, 3))).shape, (2,))
+        with open(os.path.join(output_dir, 'crash_model.json')) as f:
+            self.assertEqual(json.load(f)['model'], metadata['model'])
+        self.assertIn('search', metadata['timings'])
+        self.assertEqual(len(os.listdir(os.path.join(output_dir, 'cache'))), 1)
+
+        # A second run reuses the cached raster and gives the same result.
+        metadata_cached = train(os.path.join(self.temp_dir.name, 'crashes.csv'),
+                                os.path.join(self.temp_dir.name, 'rides.csv'), **kwargs)
+        self.assertEqual(metadata_cached['test_metrics'], metadata['test_metrics'])
+
+
+if __name__ == '__main__':
+    unittest.main()
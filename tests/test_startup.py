@@ -0,0 +1,58 @@
+import unittest
+import os
+import sys
+import json
+import subprocess
+
+# Cold-import budget in seconds for all dataset and modeling modules together. Most of it is spent
+# importing numpy and pandas, the heavy optional dependencies must not be loaded at import time.
+STARTUP_BUDGET = float(os.environ.get('STARTUP_BUDGET', 2.0))
+
+MODULES = [
+    'datasets.bike_crash_dataset',
+    'datasets.citibike_dataset',
+    'datasets.ride_store',
+    'datasets.service_area',
+    'modeling.density_estimator',
+    'modeling.price_calculator',
+    'modeling.route_risk',
+    'modeling.station_locator',
+    'modeling.station_exposure',
+    'modeling.training',
+    'modeling.traffic_counter',
+    'modeling.risk_cube',
+    'modeling.batch_pricing',
+    'modeling.portfolio_simulation',
+    'modeling.pricing_snapshot',
+    'modeling.hot_reload',
+    'modeling.tile_export',
+    'modeling.fingerprint',
+]
+
+HEAVY_MODULES = ['matplotlib', 'sklearn', 'scipy', 'pyproj', 'shapely']
+
+SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+for module in {MODULES!r}:
+    __import__(module)
+elapsed = time.perf_counter() - start
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(json.dumps({{'elapsed': elapsed, 'loaded': loaded}}))
+"""
+
+
+class TestStartup(unittest.TestCase):
+    def test_cold_import(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, '-c', SCRIPT], cwd=root, capture_output=True, text=True, check=True)
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+
+        self.assertEqual(report['loaded'], [], "Heavy optional dependencies are imported at module load.")
+        self.assertLess(report['elapsed'], STARTUP_BUDGET,
+                        f"Cold import took {report['elapsed']:.2f}s, budget is {STARTUP_BUDGET:.2f}s.")
+
+
+if __name__ == '__main__':
+    unittest.main()